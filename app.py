@@ -1,203 +1,99 @@
 import streamlit as st
-from docx import Document
-from docx.shared import RGBColor
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import os
-from pathlib import Path
-from datetime import datetime
-import tempfile
-import zipfile
-import io
+# 첫 화면에는 가벼운 모듈만 불러오고, docx/lxml/gspread 등은 처음 쓸 때 불러온다
+from damha.archive import ArchiveLimitError, ResultSession
+from damha.config import DEFAULT_WORKERS
+from damha.keywords import shared_keyword_cache
+from damha.sheets import authorize, read_keyword_notes
+from damha.timing import StageTimings
+
+SPREADSHEET_URL = 'https://docs.google.com/spreadsheets/d/1eNCbstSMyQAA7CPvwb2qE7kZWg40B7Jf-fJ7ti0ABOE/edit?gid=0'
+
+def fetch_keywords_from_sheet():
+    """구글 시트에서 키워드와 사유를 가져오는 함수 (실패 시 예외 발생)"""
+    try:
+        # Streamlit Cloud의 secrets에서 인증 정보 가져오기
+        client = authorize(st.secrets["gcp_service_account"])
+    except:
+        # 로컬에서 실행할 때는 json 파일 사용
+        client = authorize(keyfile='D:/이채윤 파일/코딩/colab-408723-89110ae33a5b.json')
+    
+    # 키워드와 사유/제안 한 번에 가져오기 (B3부터)
+    return read_keyword_notes(client.open_by_url(SPREADSHEET_URL).worksheet('키워드'))
+
+def get_keyword_cache():
+    """프로세스 전체에서 공유하는 키워드 캐시 (디스크 스냅샷이 있으면 시트를 기다리지 않음)"""
+    return shared_keyword_cache(fetch_keywords_from_sheet, source=SPREADSHEET_URL)
 
 def get_keywords_from_sheet():
-    """구글 시트에서 키워드와 사유를 가져오는 함수"""
+    """캐시된 키워드와 사유를 가져오는 함수 (만료 시 백그라운드에서 새로고침)"""
     try:
-        # 구글 시트 인증
-        scope = ['https://spreadsheets.google.com/feeds',
-                'https://www.googleapis.com/auth/drive']
-        
-        try:
-            # Streamlit Cloud의 secrets에서 인증 정보 가져오기
-            credentials = {
-                "type": st.secrets["gcp_service_account"]["type"],
-                "project_id": st.secrets["gcp_service_account"]["project_id"],
-                "private_key_id": st.secrets["gcp_service_account"]["private_key_id"],
-                "private_key": st.secrets["gcp_service_account"]["private_key"],
-                "client_email": st.secrets["gcp_service_account"]["client_email"],
-                "client_id": st.secrets["gcp_service_account"]["client_id"],
-                "auth_uri": st.secrets["gcp_service_account"]["auth_uri"],
-                "token_uri": st.secrets["gcp_service_account"]["token_uri"],
-                "auth_provider_x509_cert_url": st.secrets["gcp_service_account"]["auth_provider_x509_cert_url"],
-                "client_x509_cert_url": st.secrets["gcp_service_account"]["client_x509_cert_url"]
-            }
-            creds = ServiceAccountCredentials.from_json_keyfile_dict(credentials, scope)
-        except:
-            # 로컬에서 실행할 때는 json 파일 사용
-            creds = ServiceAccountCredentials.from_json_keyfile_name(
-                'D:/이채윤 파일/코딩/colab-408723-89110ae33a5b.json', 
-                scope
-            )
-        
-        client = gspread.authorize(creds)
-        
-        # 시트 열기
-        sheet = client.open_by_url(
-            'https://docs.google.com/spreadsheets/d/1eNCbstSMyQAA7CPvwb2qE7kZWg40B7Jf-fJ7ti0ABOE/edit?gid=0'
-        ).worksheet('키워드')
-        
-        # 키워드와 사유/제안 가져오기
-        keywords = sheet.col_values(2)[2:]  # B3부터
-        reasons = sheet.col_values(3)[2:]   # C3부터
-        
-        # 딕셔너리로 변환
-        keyword_notes = {}
-        for keyword, reason in zip(keywords, reasons):
-            if keyword.strip():  # 빈 셀 제외
-                keyword_notes[keyword] = reason if reason else ''
-                
-        return keyword_notes
-        
+        return get_keyword_cache().get().keyword_notes
     except Exception as e:
         st.error(f"구글 시트 데이터 가져오기 실패: {str(e)}")
         return None
 
-def convert_txt_to_docx(content):
-    """txt 내용을 docx로 변환"""
+def highlight_keywords(content, keyword_notes, timings=None):
+    """키워드 강조 (txt는 docx로 변환, docx/hwpx는 같은 형식으로 결과 반환)"""
+    from damha.review import review_document
+    
+    timings = timings or StageTimings('app')
     try:
-        # docx 파일 생성
-        doc = Document()
-        
-        # 텍스트 디코딩 시도
-        if isinstance(content, bytes):
-            # 여러 인코딩 시도
-            for encoding in ['utf-8', 'cp949', 'euc-kr']:
-                try:
-                    text = content.decode(encoding)
-                    break
-                except UnicodeDecodeError:
-                    continue
-        else:
-            text = content
-            
-        if not text:
-            st.error("파일을 읽을 수 없습니다.")
-            return None
-            
-        # 문단 추가 및 글꼴 설정
-        paragraph = doc.add_paragraph(text)
-        for run in paragraph.runs:
-            run.font.name = "맑은 고딕"
-            run.font.ascii_font = "맑은 고딕"
-            run.font.eastasia_font = "맑은 고딕"
+        # 임시 파일 없이 메모리에서 바로 처리 (큰 docx는 스트리밍, hwpx는 XML에서 바로)
+        with timings.stage('highlight_keywords', file=content.name, bytes_in=content.size) as stage:
+            result, stage['hits'] = review_document(content.getvalue(),
+                                                    content.type == "text/plain",
+                                                    keyword_notes,
+                                                    timings=timings,
+                                                    name=content.name)
+            stage['bytes_out'] = len(result)
+            return result
         
-        # 임시 파일로 저장
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp:
-            doc.save(tmp.name)
-            return tmp.name
-            
     except Exception as e:
-        st.error(f"변환 중 오류 발생: {str(e)}")
+        st.error(f"오류 발생: {str(e)}")
         return None
 
-def highlight_keywords(content, keyword_notes):
-    """키워드 강조"""
-    try:
-        # 파일 확장자 확인
-        if content.type == "text/plain":
-            # txt 파일을 docx로 변환
-            file_content = content.getvalue()
-            doc_path = convert_txt_to_docx(file_content)
-            if not doc_path:
-                return None
-        else:
-            # docx 파일 임시 저장
-            with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp:
-                tmp.write(content.getvalue())
-                doc_path = tmp.name
+def get_result_session():
+    """세션마다 하나인 결과 보관소 (세션이 끝나면 결과 임시 파일 정리)"""
+    if 'result_session' not in st.session_state:
+        st.session_state['result_session'] = ResultSession()
+    return st.session_state['result_session']
 
-        # docx 파일 처리
-        doc = Document(doc_path)
-        
-        # 모든 단락을 순회
-        for paragraph in doc.paragraphs:
-            # 단락의 텍스트 저장
-            text = paragraph.text
-            
-            # 키워드 위치 찾기
-            positions = []
-            for keyword in keyword_notes.keys():
-                start = 0
-                while True:
-                    index = text.find(keyword, start)
-                    if index == -1:
-                        break
-                    positions.append((index, index + len(keyword), keyword))
-                    start = index + 1
-            
-            if positions:
-                # 위치를 정렬
-                positions.sort()
-                
-                # 기존 runs 제거
-                for run in paragraph.runs:
-                    run._element.getparent().remove(run._element)
-                
-                # 새로운 runs 추가
-                current_pos = 0
-                for start, end, keyword in positions:
-                    # 키워드 전 텍스트
-                    if start > current_pos:
-                        run = paragraph.add_run(text[current_pos:start])
-                        run.font.name = "맑은 고딕"
-                    
-                    # 키워드 (빨간색으로, 굵게)
-                    run = paragraph.add_run(keyword)
-                    run.font.name = "맑은 고딕"
-                    run.font.color.rgb = RGBColor(251, 65, 65)
-                    run.bold = True
-                    
-                    # 노트 추가
-                    if keyword_notes[keyword]:
-                        note_run = paragraph.add_run(f" {keyword_notes[keyword]}")
-                        note_run.font.name = "맑은 고딕"
-                        note_run.font.color.rgb = RGBColor(92, 179, 56)
-                    
-                    current_pos = end
-                
-                # 마지막 키워드 이후 텍스트
-                if current_pos < len(text):
-                    run = paragraph.add_run(text[current_pos:])
-                    run.font.name = "맑은 고딕"
-        
-        # 결과 파일 저장
-        result_path = os.path.join(tempfile.gettempdir(), "검수결과.docx")
-        doc.save(result_path)
-        
-        # 임시 파일 삭제
-        try:
-            os.remove(doc_path)
-        except:
-            pass
-            
-        return result_path
-        
-    except Exception as e:
-        st.error(f"오류 발생: {str(e)}")
-        return None
+def show_timings(timings):
+    """단계별 처리 시간 표시 (사이드바에서 켠 경우에만)"""
+    with st.expander("단계별 처리 시간"):
+        st.caption(f"실행 ID {timings.run_id} (로그에서 같은 ID로 찾을 수 있습니다)")
+        st.dataframe(timings.summary())
+        st.dataframe(timings.records)
 
 def main():
     st.title("의료광고 표현 검수 시스템")
     
+    # 단계별 처리 시간 기록 (화면 표시는 사이드바에서 선택)
+    timings = StageTimings('app')
+    show_timing_panel = st.sidebar.checkbox("단계별 처리 시간 보기")
+    
     # 구글 시트에서 키워드 가져오기
-    keyword_notes = get_keywords_from_sheet()
+    with timings.stage('get_keywords_from_sheet') as stage:
+        keyword_notes = get_keywords_from_sheet()
+        stage['hits'] = len(keyword_notes) if keyword_notes else 0
     if not keyword_notes:
         st.error("키워드를 가져오지 못했습니다.")
         return
     
+    # 사용 중인 키워드 버전 표시
+    st.caption(get_keyword_cache().current.describe())
+    
+    # 동시에 검수할 파일 수 (1이면 한 파일씩 처리)
+    cpu_count = os.cpu_count() or 1
+    workers = st.sidebar.number_input("동시 처리 프로세스 수",
+                                      min_value=1,
+                                      max_value=max(cpu_count, DEFAULT_WORKERS),
+                                      value=DEFAULT_WORKERS)
+    
     # 여러 파일 업로드
     uploaded_files = st.file_uploader("검수할 파일을 모두 업로드 해주세요.",
-                                    type=['txt', 'docx'],
+                                    type=['txt', 'docx', 'hwpx'],
                                     accept_multiple_files=True)
     
     if uploaded_files:
@@ -205,43 +101,86 @@ def main():
             # 진행 상황을 보여줄 프로그레스 바
             progress_bar = st.progress(0)
             
-            # ZIP 파일 생성을 위한 메모리 버퍼
-            zip_buffer = io.BytesIO()
+            # 결과 ZIP (다운로드할 때 전부 메모리로 읽으므로 크기는 세션/전체 메모리 한도 안에서)
+            # 이 세션의 이전 결과는 여기서 정리된다
+            archive = get_result_session().new_archive()
+            # 한도를 넘어 검수를 멈춘 파일 (이후 파일은 검수하지 않음)
+            stopped_at = None
             
-            # ZIP 파일 생성
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            if workers > 1 and len(uploaded_files) > 1:
+                # 여러 프로세스에서 동시에 검수 (결과는 업로드 순서대로)
+                from damha.review import review_files
+                with st.spinner(f"{len(uploaded_files)}개 파일 검수 중..."):
+                    results = review_files(
+                        [(f.getvalue(), f.type == "text/plain") for f in uploaded_files],
+                        keyword_notes,
+                        workers=workers,
+                        on_progress=lambda done, total: progress_bar.progress(done / total),
+                        with_stats=True
+                    )
+                    
+                    try:
+                        for uploaded_file, (result, error, stats) in zip(uploaded_files, results):
+                            if error:
+                                st.error(f"'{uploaded_file.name}' 오류 발생: {str(error)}")
+                                continue
+                            # 작업 프로세스에서 잰 검수 시간 (변환 포함)
+                            timings.add('highlight_keywords', stats['seconds'],
+                                        file=uploaded_file.name, bytes_in=uploaded_file.size,
+                                        bytes_out=len(result), hits=stats['hits'], worker=True)
+                            # 결과 파일을 바로 ZIP에 추가
+                            try:
+                                with timings.stage('archive', file=uploaded_file.name,
+                                                   bytes_in=len(result)):
+                                    archive.add(f"검수결과_{uploaded_file.name}", result)
+                            except ArchiveLimitError:
+                                stopped_at = uploaded_file
+                                break
+                    finally:
+                        # 멈췄으면 아직 시작하지 않은 파일은 검수하지 않음
+                        results.close()
+            else:
                 for i, uploaded_file in enumerate(uploaded_files):
                     with st.spinner(f"'{uploaded_file.name}' 검수 중..."):
-                        result_path = highlight_keywords(uploaded_file, keyword_notes)
+                        result = highlight_keywords(uploaded_file, keyword_notes, timings)
                         
-                        if result_path:
+                        if result:
                             # 결과 파일을 ZIP에 추가
-                            zip_file.write(
-                                result_path, 
-                                f"검수결과_{uploaded_file.name}"
-                            )
-                            
-                            # 임시 파일 삭제
                             try:
-                                os.remove(result_path)
-                            except:
-                                pass
+                                with timings.stage('archive', file=uploaded_file.name,
+                                                   bytes_in=len(result)):
+                                    archive.add(f"검수결과_{uploaded_file.name}", result)
+                            except ArchiveLimitError:
+                                stopped_at = uploaded_file
+                                break
                     
                     # 진행률 업데이트
                     progress = (i + 1) / len(uploaded_files)
                     progress_bar.progress(progress)
             
-            # 검수 완료 메시지
-            st.success("모든 파일 검수가 완료되었습니다!")
+            if stopped_at is not None:
+                st.error(f"검수 결과가 메모리 한도를 넘어 '{stopped_at.name}'부터는 검수하지 "
+                         f"않았습니다. 남은 파일은 나눠서 다시 검수해주세요.")
+            else:
+                # 검수 완료 메시지
+                st.success("모든 파일 검수가 완료되었습니다!")
+            
+            # ZIP 파일 다운로드 버튼 (한도를 넘기 전까지 검수한 결과)
+            if archive.count:
+                with timings.stage('archive_finish') as stage:
+                    stage['on_disk'] = archive.on_disk
+                    # 다운로드 버튼이 들고 있는 동안(다음 검수 전까지) 세션 한도에서 차감
+                    zip_data = archive.take()
+                    stage['bytes_out'] = len(zip_data)
+                st.download_button(
+                    label="모든 검수 결과 다운로드 (ZIP)",
+                    data=zip_data,
+                    file_name="검수결과_전체.zip",
+                    mime="application/zip"
+                )
             
-            # ZIP 파일 다운로드 버튼
-            zip_buffer.seek(0)
-            st.download_button(
-                label="모든 검수 결과 다운로드 (ZIP)",
-                data=zip_buffer,
-                file_name="검수결과_전체.zip",
-                mime="application/zip"
-            )
+            if show_timing_panel:
+                show_timings(timings)
 
 if __name__ == "__main__":
     main() 
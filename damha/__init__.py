@@ -0,0 +1,4 @@
+"""원고 검수 공용 모듈"""
+from .matcher import Hits, KeywordMatcher, compile_keywords
+from .keywords import KeywordCache, KeywordSet, shared_keyword_cache
+from .snapshot import MappedKeywordMatcher, SnapshotStore
@@ -0,0 +1,192 @@
+"""검수 결과 ZIP 묶음
+
+ZIP은 메모리에서 만들다가 DEFAULT_MAX_MEMORY를 넘으면 임시 파일로 넘긴다. 다만 다운로드할
+때는 ZIP 전체를 bytes로 읽어 들이므로 임시 파일로 넘겨도 메모리 사용량이 줄지는 않는다.
+그래서 메모리 한도(세션별, 프로세스 전체)는 메모리/디스크와 상관없이 ZIP 전체 크기로
+차감하고, 한도를 넘는 결과는 추가하지 않고 ArchiveLimitError를 낸다. 세션마다
+ResultSession 하나를 두면 결과 임시 파일은 세션 전용 폴더에 쓰이고, 세션이 끝나거나
+(객체가 사라지면) 프로세스가 끝날 때 함께 지워진다.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+import zipfile
+
+# 이 크기를 넘으면 ZIP을 메모리 대신 임시 파일에 기록 (바이트)
+DEFAULT_MAX_MEMORY = int(os.environ.get('DAMHA_ZIP_MEMORY_LIMIT', 64 * 1024 * 1024))
+# 세션 하나가 메모리에 들고 있을 수 있는 결과 크기 (바이트)
+SESSION_MEMORY_BUDGET = int(os.environ.get('DAMHA_SESSION_MEMORY_BUDGET', 128 * 1024 * 1024))
+# 모든 세션을 합친 한도 (바이트)
+TOTAL_MEMORY_BUDGET = int(os.environ.get('DAMHA_TOTAL_MEMORY_BUDGET', 512 * 1024 * 1024))
+# 결과 임시 파일을 둘 폴더 (없으면 시스템 임시 폴더)
+RESULT_DIR = os.environ.get('DAMHA_RESULT_DIR') or None
+
+# ZIP 항목 하나에 붙는 머리글 여유분 (파일 이름, 로컬/중앙 디렉터리 헤더)
+_ENTRY_OVERHEAD = 1024
+
+# 이미 압축된 형식은 다시 압축하지 않고 그대로 저장
+_COMPRESSED_EXTENSIONS = ('.docx', '.hwpx', '.zip', '.png', '.jpg', '.jpeg')
+
+
+class ArchiveLimitError(Exception):
+    """결과 ZIP이 메모리 한도를 넘음"""
+
+
+class MemoryBudget:
+    """메모리에 들고 있는 결과 크기 한도 (parent가 있으면 parent 한도도 함께 차감)"""
+
+    def __init__(self, limit, parent=None):
+        self.limit = limit
+        self.parent = parent
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, size):
+        """size만큼 쓸 수 있으면 차감하고 True, 한도를 넘으면 False"""
+        with self._lock:
+            if self.used + size > self.limit:
+                return False
+            if self.parent is not None and not self.parent.reserve(size):
+                return False
+            self.used += size
+            return True
+
+    def release(self, size):
+        with self._lock:
+            self.used -= size
+        if self.parent is not None:
+            self.parent.release(size)
+
+
+# 프로세스 전체 한도 (세션별 한도의 parent)
+total_budget = MemoryBudget(TOTAL_MEMORY_BUDGET)
+
+
+class ResultArchive:
+    """결과 파일을 메모리에서 바로 ZIP에 쓰고, 커지면 디스크로 넘기는 묶음
+
+    budget(MemoryBudget)을 주면 discard()할 때까지 ZIP 크기만큼 한도에서 차감하고, 한도가
+    모자라면 그 파일은 추가하지 않고 ArchiveLimitError를 낸다. dir은 임시 파일을 둘 폴더다.
+    """
+
+    def __init__(self, max_memory=DEFAULT_MAX_MEMORY, budget=None, dir=None):
+        self._buffer = tempfile.SpooledTemporaryFile(max_size=max_memory, suffix='.zip', dir=dir)
+        self._zip = zipfile.ZipFile(self._buffer, 'w', zipfile.ZIP_DEFLATED)
+        self._budget = budget
+        self._reserved = 0
+        self.count = 0
+
+    def add(self, name, data):
+        """결과 파일(bytes) 추가"""
+        if name.lower().endswith(_COMPRESSED_EXTENSIONS) or data[:4] == b'PK\x03\x04':
+            compress_type = zipfile.ZIP_STORED
+        else:
+            compress_type = zipfile.ZIP_DEFLATED
+        # 쓰기 전에 압축 전 크기만큼 미리 차감 (모자라면 쓰지 않고 ArchiveLimitError)
+        self._settle(self._size() + len(data) + _ENTRY_OVERHEAD)
+        self._zip.writestr(name, data, compress_type=compress_type)
+        self.count += 1
+        self._settle()
+
+    def _size(self):
+        """ZIP 크기 (마무리 전이면 중앙 디렉터리 여유분 포함)"""
+        if self._zip.fp is None:
+            return self._buffer.tell()
+        return self._buffer.tell() + self.count * _ENTRY_OVERHEAD
+
+    def _settle(self, size=None):
+        """한도에서 차감한 크기를 ZIP 크기(size)에 맞춤 (모자라면 ArchiveLimitError)"""
+        if self._budget is None:
+            return
+        if size is None:
+            size = self._size()
+        if size > self._reserved:
+            if not self._budget.reserve(size - self._reserved):
+                raise ArchiveLimitError("결과 ZIP이 메모리 한도를 넘습니다.")
+            self._reserved = size
+        elif size < self._reserved:
+            self._budget.release(self._reserved - size)
+            self._reserved = size
+
+    def _release(self):
+        if self._reserved:
+            self._budget.release(self._reserved)
+            self._reserved = 0
+
+    def close(self):
+        """ZIP 마무리 (중앙 디렉터리 기록)"""
+        if self._zip.fp is not None:
+            self._zip.close()
+            self._settle()
+
+    @property
+    def on_disk(self):
+        """임시 파일로 넘어갔는지 여부"""
+        return self._buffer._rolled
+
+    def getvalue(self):
+        """완성된 ZIP 내용 반환"""
+        self.close()
+        self._buffer.seek(0)
+        return self._buffer.read()
+
+    def take(self):
+        """완성된 ZIP 내용을 bytes로 꺼내고 버퍼 정리
+
+        budget이 있으면 꺼낸 bytes 크기는 discard()할 때까지 계속 한도에서 차감해 둔다.
+        """
+        data = self.getvalue()
+        self._buffer.close()
+        return data
+
+    def discard(self):
+        """버퍼 정리 (임시 파일이면 삭제, 메모리 한도 반환)"""
+        self.close()
+        self._buffer.close()
+        if self._budget is not None:
+            self._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _cleanup(directory, archives):
+    """세션 결과 정리 (ZIP 버퍼와 임시 폴더 삭제)"""
+    for archive in archives:
+        archive.discard()
+    archives.clear()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class ResultSession:
+    """세션 하나의 결과 보관 (세션별 메모리 한도, 전용 임시 폴더)
+
+    세션 상태에 넣어 두면 세션이 끝나 객체가 사라질 때(또는 프로세스가 끝날 때)
+    남은 결과와 임시 폴더가 지워진다. 새 검수를 시작하면 이전 결과는 바로 정리한다.
+    결과 ZIP 크기(take()로 꺼낸 bytes 포함)는 그때까지 세션 한도에서 차감해 둔다.
+    """
+
+    def __init__(self, memory_budget=SESSION_MEMORY_BUDGET, max_memory=DEFAULT_MAX_MEMORY):
+        self.directory = tempfile.mkdtemp(prefix='damha-results-', dir=RESULT_DIR)
+        self.budget = MemoryBudget(memory_budget, total_budget)
+        self.max_memory = max_memory
+        self._archives = []
+        self._finalizer = weakref.finalize(self, _cleanup, self.directory, self._archives)
+
+    def new_archive(self):
+        """새 결과 ZIP (이전 결과는 정리)"""
+        for archive in self._archives:
+            archive.discard()
+        self._archives.clear()
+        archive = ResultArchive(self.max_memory, budget=self.budget, dir=self.directory)
+        self._archives.append(archive)
+        return archive
+
+    def close(self):
+        """결과와 임시 폴더를 바로 정리"""
+        self._finalizer()
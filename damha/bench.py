@@ -0,0 +1,435 @@
+"""검수 엔진 성능 측정
+
+합성 원고(txt/docx)와 합성 키워드 세트(10 ~ 20,000개)로 검수 단계별 처리량을 재고,
+결과를 JSON 파일로 남긴다. 버전마다 결과 파일을 남겨 두고 --compare로 비교하면
+느려진 항목을 바로 확인할 수 있다.
+
+    python -m damha.bench --output bench.json
+    python -m damha.bench --quick --compare bench.json
+    python -m damha.bench --startup --output startup.json
+
+측정 항목마다 새 프로세스에서 실행해서 최대 메모리(RSS)가 서로 섞이지 않게 한다.
+--startup은 Streamlit 진입점을 새 인터프리터에서 불러오는 시간을 재고, 예산을 넘거나
+첫 화면에 필요 없는 무거운 모듈을 불러오면 실패로 표시한다.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 합성 원고에 쓰는 음절과 단어
+_SYLLABLES = '가나다라마바사아자차카타파하고노도로모보소오조초코토포호구누두루무부수우주추쿠투푸후기니디리미비시이지치키티피히'
+_WORDS = ['시술', '치료', '효과', '병원', '환자', '상담', '예약', '통증', '회복', '관리',
+          '피부', '안전', '검사', '진료', '수술', '만족', '후기', '결과', '방법', '기간']
+_ENDINGS = ['입니다.', '합니다.', '있습니다.', '드립니다.', '됩니다.', '하세요.']
+
+DEFAULT_KEYWORD_COUNTS = (10, 1000, 20000)
+DEFAULT_DOC_CHARS = (10000, 200000)
+QUICK_KEYWORD_COUNTS = (10, 1000)
+QUICK_DOC_CHARS = (10000,)
+
+# 원고 1,000자마다 넣을 키워드 수
+HIT_DENSITY = 5
+
+
+def make_keywords(count, seed=0):
+    """합성 키워드 세트 {키워드: 사유} (절반은 사유 없음)"""
+    rng = random.Random(seed)
+    keyword_notes = {}
+    while len(keyword_notes) < count:
+        length = rng.randint(2, 6)
+        keyword = ''.join(rng.choice(_SYLLABLES) for _ in range(length))
+        if rng.random() < 0.2:
+            # 띄어쓰기가 들어간 키워드
+            cut = rng.randint(1, length - 1)
+            keyword = f"{keyword[:cut]} {keyword[cut:]}"
+        keyword_notes[keyword] = f"사유 {len(keyword_notes)}" if rng.random() < 0.5 else ''
+    return keyword_notes
+
+
+def make_text(chars, keyword_notes, seed=0, density=HIT_DENSITY):
+    """합성 원고 (한 줄 40~120자, 1,000자마다 키워드 density개)"""
+    rng = random.Random(seed)
+    keywords = list(keyword_notes)
+    hit_every = 1000 // density if density else 0
+    lines = []
+    line = []
+    line_length = rng.randint(40, 120)
+    total = 0
+    next_hit = hit_every
+    while total < chars:
+        if hit_every and total >= next_hit:
+            word = rng.choice(keywords)
+            next_hit += hit_every
+        elif rng.random() < 0.15:
+            word = rng.choice(_ENDINGS)
+        else:
+            word = rng.choice(_WORDS)
+        line.append(word)
+        total += len(word) + 1
+        if sum(len(w) + 1 for w in line) >= line_length:
+            lines.append(' '.join(line))
+            line = []
+            line_length = rng.randint(40, 120)
+    if line:
+        lines.append(' '.join(line))
+    return '\n'.join(lines)
+
+
+def make_docx(text):
+    """줄마다 단락 하나인 docx (bytes)"""
+    from docx import Document
+    doc = Document()
+    for line in text.split('\n'):
+        doc.add_paragraph(line)
+    output = io.BytesIO()
+    doc.save(output)
+    return output.getvalue()
+
+
+def make_ocr_result(text, seed=0, skew=0.01):
+    """합성 CLOVA OCR 응답 (단어마다 필드 하나, 살짝 기울어진 줄, 순서는 섞음)"""
+    rng = random.Random(seed)
+    fields = []
+    for row, line in enumerate(text.split('\n')):
+        x = 20.0
+        for word in line.split():
+            width = 14.0 * len(word)
+            y = 30.0 + row * 24.0 + x * skew
+            fields.append({
+                'inferText': word,
+                'boundingPoly': {'vertices': [
+                    {'x': x, 'y': y}, {'x': x + width, 'y': y + width * skew},
+                    {'x': x + width, 'y': y + 16 + width * skew}, {'x': x, 'y': y + 16}
+                ]}
+            })
+            x += width + 8
+    rng.shuffle(fields)
+    return {'images': [{'fields': fields}]}
+
+
+# 측정 대상 (이름: 설명)
+ENGINES = {
+    'highlight_keywords': "docx 검수 (review_document)",
+    'convert_txt_to_docx': "txt 디코딩 + 줄별 docx 변환/검수 (highlight_text_stream)",
+    'create_review_document': "OCR 텍스트 검수 문서 생성 (review_text_document)",
+    'build_lines': "OCR 줄 나누기 (build_lines)",
+}
+
+
+def _prepare(engine, chars, keyword_count, seed):
+    """(측정 함수, 입력 크기 bytes) 준비 (측정 시간에 포함하지 않음)"""
+    from .matcher import compile_keywords
+    keyword_notes = make_keywords(keyword_count, seed)
+    text = make_text(chars, keyword_notes, seed)
+
+    if engine == 'highlight_keywords':
+        from .review import review_document
+        data = make_docx(text)
+        # 검색기는 캐시되므로 미리 한 번 만들어 두고 검수 시간만 잰다
+        compile_keywords(keyword_notes)
+        return (lambda: review_document(data, False, keyword_notes)[1]), len(data)
+
+    if engine == 'convert_txt_to_docx':
+        from .text_stream import highlight_text_stream
+        data = text.encode('utf-8')
+        compile_keywords(keyword_notes)
+        return (lambda: highlight_text_stream(io.BytesIO(data), io.BytesIO(), keyword_notes)), len(data)
+
+    if engine == 'create_review_document':
+        from .review import review_text_document
+        compile_keywords(keyword_notes)
+        return (lambda: review_text_document(text, keyword_notes)[1]), len(text.encode('utf-8'))
+
+    if engine == 'build_lines':
+        from .ocr import build_lines
+        result = make_ocr_result(text, seed)
+
+        def run():
+            build_lines(result)
+            return 0
+        return run, len(json.dumps(result, ensure_ascii=False).encode('utf-8'))
+
+    raise ValueError(f"알 수 없는 측정 대상: {engine}")
+
+
+def _peak_rss():
+    """지금까지의 최대 RSS (바이트, 측정할 수 없으면 None)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS는 바이트, Linux는 KB 단위
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_case(engine, chars, keyword_count, repeat, seed=0):
+    """측정 항목 하나 실행, 결과 딕셔너리 반환"""
+    func, input_bytes = _prepare(engine, chars, keyword_count, seed)
+    # 첫 실행(지연 import, 캐시 준비)은 측정에서 뺀다
+    hits = func()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    # 할당량은 느려지는 tracemalloc을 켠 채로 한 번 더 실행해서 따로 잰다
+    tracemalloc.start()
+    func()
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = statistics.median(times)
+    return {
+        'engine': engine,
+        'doc_chars': chars,
+        'input_bytes': input_bytes,
+        'keywords': keyword_count,
+        'repeat': repeat,
+        'hits': hits,
+        'seconds_median': median,
+        'seconds_min': min(times),
+        'docs_per_sec': 1 / median if median else None,
+        'chars_per_sec': chars / median if median else None,
+        'peak_rss_bytes': _peak_rss(),
+        'alloc_peak_bytes': alloc_peak,
+    }
+
+
+# 시작 시간을 잴 진입점 (이름: 저장소 루트 기준 경로)
+STARTUP_ENTRIES = {
+    'app': 'app.py',
+    'img': os.path.join('원고검수', 'img통합검수.py'),
+}
+# 진입점 import 시간 예산 (밀리초, Streamlit 자체를 불러오는 시간은 제외)
+STARTUP_BUDGET_MS = float(os.environ.get('DAMHA_STARTUP_BUDGET_MS', 150))
+# 첫 화면을 그릴 때 불러오지 않아야 하는 모듈 (처음 쓸 때 불러옴)
+DEFERRED_MODULES = ('docx', 'lxml', 'gspread', 'oauth2client', 'requests', 'PIL', 'numpy')
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 새 인터프리터에서 실행하는 측정 코드 (마지막 줄에 JSON 출력)
+_STARTUP_PROBE = """
+import importlib.util, json, sys, time
+watch = sys.argv[2:]
+start = time.perf_counter()
+import streamlit
+base = time.perf_counter()
+preloaded = [name for name in watch if name in sys.modules]
+spec = importlib.util.spec_from_file_location('damha_entry', sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+end = time.perf_counter()
+loaded = [name for name in watch if name in sys.modules and name not in preloaded]
+print(json.dumps({'streamlit_ms': (base - start) * 1000, 'entry_ms': (end - base) * 1000,
+                  'loaded': loaded}))
+"""
+
+_IMPORT_PROBE = """
+import importlib, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def _probe(code, *args):
+    """새 인터프리터에서 측정 코드를 실행하고 마지막 출력 줄 반환"""
+    completed = subprocess.run([sys.executable, '-c', code, *args], cwd=_ROOT,
+                               capture_output=True, text=True, timeout=300)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        error = completed.stderr.strip().splitlines()
+        raise RuntimeError(error[-1] if error else f"종료 코드 {completed.returncode}")
+    return lines[-1]
+
+
+def measure_startup(name, path, repeat=5, budget_ms=STARTUP_BUDGET_MS):
+    """진입점 하나를 새 인터프리터에서 repeat번 불러와서 결과 딕셔너리 반환"""
+    runs = [json.loads(_probe(_STARTUP_PROBE, path, *DEFERRED_MODULES)) for _ in range(repeat)]
+    entry_ms = statistics.median(run['entry_ms'] for run in runs)
+    loaded = sorted({module for run in runs for module in run['loaded']})
+    return {
+        'entry': name,
+        'path': path,
+        'repeat': repeat,
+        'streamlit_ms': statistics.median(run['streamlit_ms'] for run in runs),
+        'entry_ms': entry_ms,
+        'budget_ms': budget_ms,
+        'loaded_heavy_modules': loaded,
+        'ok': entry_ms <= budget_ms and not loaded,
+    }
+
+
+def measure_deferred_imports(repeat=3):
+    """첫 화면에서 뺀 모듈을 처음 쓸 때 드는 import 시간 {모듈: 밀리초} (설치되지 않은 모듈은 None)"""
+    costs = {}
+    for module in DEFERRED_MODULES:
+        try:
+            costs[module] = statistics.median(float(_probe(_IMPORT_PROBE, module))
+                                              for _ in range(repeat))
+        except RuntimeError:
+            costs[module] = None
+    return costs
+
+
+def run_startup(repeat, budget_ms):
+    """모든 진입점 시작 시간 측정, (진입점 결과 목록, 지연 import 비용) 반환"""
+    results = []
+    for name, path in STARTUP_ENTRIES.items():
+        result = measure_startup(name, path, repeat, budget_ms)
+        results.append(result)
+        loaded = ', '.join(result['loaded_heavy_modules']) or '없음'
+        print(f"{name:<6} {result['entry_ms']:7.1f}ms (예산 {budget_ms:.0f}ms, "
+              f"Streamlit {result['streamlit_ms']:.0f}ms 별도)  무거운 모듈: {loaded}  "
+              f"{'통과' if result['ok'] else '초과'}", flush=True)
+    deferred = measure_deferred_imports()
+    for module, cost in deferred.items():
+        print(f"  처음 쓸 때 불러옴 {module:<14} {'-' if cost is None else f'{cost:.1f}ms'}")
+    return results, deferred
+
+
+def _case_key(result):
+    return (result['engine'], result['doc_chars'], result['keywords'])
+
+
+def _git_version():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(engines, doc_chars, keyword_counts, repeat, isolate=True, on_result=None):
+    """모든 조합 측정, 결과 목록 반환 (isolate면 항목마다 새 프로세스)"""
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for engine in engines:
+        for chars in doc_chars:
+            for keyword_count in keyword_counts:
+                if isolate:
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                        result = pool.submit(run_case, engine, chars, keyword_count,
+                                             repeat).result()
+                else:
+                    result = run_case(engine, chars, keyword_count, repeat)
+                results.append(result)
+                if on_result:
+                    on_result(result)
+    return results
+
+
+def compare(results, baseline, threshold=0.1):
+    """기준 결과와 비교해서 (항목, 기준 초, 현재 초, 비율) 목록 반환 (threshold 이상 느려진 것만)"""
+    previous = {_case_key(r): r for r in baseline.get('results', [])}
+    slower = []
+    for result in results:
+        old = previous.get(_case_key(result))
+        if not old or not old['seconds_median']:
+            continue
+        ratio = result['seconds_median'] / old['seconds_median']
+        if ratio >= 1 + threshold:
+            slower.append((_case_key(result), old['seconds_median'], result['seconds_median'], ratio))
+    return slower
+
+
+def _format(result):
+    rss = result['peak_rss_bytes']
+    rss = f"{rss / 1024 / 1024:.0f}MB" if rss else '-'
+    return (f"{result['engine']:<24} {result['doc_chars']:>8}자 키워드 {result['keywords']:>6}개  "
+            f"{result['seconds_median'] * 1000:9.1f}ms  {result['chars_per_sec'] or 0:>12,.0f}자/초  "
+            f"RSS {rss:>6}  할당 {result['alloc_peak_bytes'] / 1024 / 1024:.1f}MB")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="검수 엔진 성능 측정")
+    parser.add_argument('--output', default='bench.json', help="결과 JSON 파일 경로")
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES), default=list(ENGINES),
+                        help="측정할 대상")
+    parser.add_argument('--doc-chars', nargs='+', type=int, default=None,
+                        help="원고 크기 (글자 수)")
+    parser.add_argument('--keywords', nargs='+', type=int, default=None,
+                        help="키워드 세트 크기")
+    parser.add_argument('--repeat', type=int, default=None,
+                        help="항목마다 반복 횟수 (기본 5, --quick이면 1)")
+    parser.add_argument('--quick', action='store_true', help="작은 조합만 빠르게 측정")
+    parser.add_argument('--no-isolate', action='store_true',
+                        help="항목마다 새 프로세스를 띄우지 않음 (RSS가 누적됨)")
+    parser.add_argument('--compare', help="비교할 이전 결과 JSON 파일")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="이 비율 이상 느려지면 표시 (기본 0.1 = 10%%)")
+    parser.add_argument('--startup', action='store_true',
+                        help="엔진 대신 Streamlit 진입점의 시작(import) 시간 측정")
+    parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS,
+                        help="진입점 import 시간 예산 (밀리초, --startup에서 사용)")
+    return parser.parse_args(argv)
+
+
+def _report(**fields):
+    report = {
+        'version': _git_version(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+    report.update(fields)
+    return report
+
+
+def _save(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {path}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.startup:
+        results, deferred = run_startup(args.repeat or 5, args.budget_ms)
+        _save(_report(startup=results, deferred_imports=deferred), args.output)
+        return 0 if all(result['ok'] for result in results) else 1
+
+    doc_chars = args.doc_chars or (QUICK_DOC_CHARS if args.quick else DEFAULT_DOC_CHARS)
+    keyword_counts = args.keywords or (QUICK_KEYWORD_COUNTS if args.quick else DEFAULT_KEYWORD_COUNTS)
+    repeat = args.repeat or (1 if args.quick else 5)
+
+    results = run_suite(args.engines, doc_chars, keyword_counts, repeat,
+                        isolate=not args.no_isolate,
+                        on_result=lambda result: print(_format(result), flush=True))
+
+    _save(_report(results=results), args.output)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline, args.threshold)
+        print(f"\n{args.compare} ({baseline.get('version') or '버전 정보 없음'}) 대비")
+        if not slower:
+            print("  느려진 항목 없음")
+        for (engine, chars, keyword_count), old, new, ratio in slower:
+            print(f"  {engine} {chars}자 키워드 {keyword_count}개: "
+                  f"{old * 1000:.1f}ms → {new * 1000:.1f}ms ({ratio:.2f}배)")
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+"""화면에서 바로 쓰는 기본값 (무거운 모듈을 불러오지 않고 읽을 수 있도록 따로 둠)"""
+import os
+
+# 동시 처리 프로세스 수 (기본: CPU 개수)
+DEFAULT_WORKERS = int(os.environ.get('DAMHA_REVIEW_WORKERS', 0)) or os.cpu_count() or 1
+
+# 이 크기 이상의 docx는 스트리밍으로 처리 (바이트)
+STREAM_THRESHOLD = int(os.environ.get('DAMHA_STREAM_THRESHOLD', 20 * 1024 * 1024))
+
+# 동시에 보내는 OCR 요청 수
+DEFAULT_CONCURRENCY = int(os.environ.get('DAMHA_OCR_CONCURRENCY', 4))
+# 요청 하나에 묶어 보낼 최대 이미지 수 (1이면 묶지 않음)
+DEFAULT_BATCH_IMAGES = int(os.environ.get('DAMHA_OCR_BATCH_IMAGES', 1))
@@ -0,0 +1,190 @@
+"""큰 docx용 스트리밍 검수 (python-docx 문서 객체를 만들지 않음)
+
+word/document.xml을 iterparse로 본문 블록(단락/표) 단위로 읽어서 바로 쓰고,
+키워드가 있는 단락만 python-docx 경로와 같은 highlight_paragraph로 고친다.
+나머지 zip 항목(이미지, 스타일 등)은 압축을 풀지 않고 그대로 복사한다.
+"""
+import os
+import shutil
+import struct
+import zipfile
+
+from docx.oxml.ns import qn
+from docx.oxml.parser import element_class_lookup
+from docx.text.paragraph import Paragraph
+from lxml import etree
+
+from .config import STREAM_THRESHOLD
+from .matcher import compile_keywords
+from .review import highlight_paragraph
+
+DOCUMENT_PART = 'word/document.xml'
+
+_XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+_MARKER = 'DAMHA-SPLIT'
+_BODY = qn('w:body')
+_P = qn('w:p')
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+
+def _open_close_tags(elem):
+    """요소의 여는 태그/닫는 태그 (자식은 아직 읽지 않은 상태)"""
+    shell = etree.Element(elem.tag, attrib=dict(elem.attrib), nsmap=elem.nsmap)
+    shell.text = _MARKER
+    head, tail = etree.tostring(shell, encoding='utf-8').split(_MARKER.encode())
+    return head, tail
+
+
+def _namespace_decls(elem):
+    """요소에서 선언된 네임스페이스 속성 목록 (바이트)"""
+    decls = []
+    for prefix, uri in elem.nsmap.items():
+        name = f'xmlns:{prefix}' if prefix else 'xmlns'
+        decls.append(f' {name}="{uri}"'.encode('utf-8'))
+    return decls
+
+
+def _strip_inherited(data, inherited):
+    """여는 태그에서 루트에 이미 선언된 네임스페이스 선언 제거
+
+    lxml은 잘라낸 요소의 여는 태그에 네임스페이스 선언을 모두 붙이므로 중복만 뺀다.
+    """
+    end = data.index(b'>')
+    head = data[:end]
+    for decl in inherited:
+        head = head.replace(decl, b'', 1)
+    return head + data[end:]
+
+
+def _serialize_block(elem, inherited):
+    """본문 블록 직렬화 (루트에 이미 선언된 네임스페이스는 다시 쓰지 않음)"""
+    return _strip_inherited(etree.tostring(elem, encoding='utf-8'), inherited)
+
+
+# copy_raw_member가 직접 다루는 zipfile 내부 속성
+_ZIP_INTERNALS = ('fp', 'start_dir', 'filelist', 'NameToInfo', '_didModify')
+
+
+def _can_copy_raw(zin, zout):
+    """zipfile 내부 상태를 직접 다룰 수 있는지 (Python 버전에 따라 없을 수 있음)"""
+    return (getattr(zin, 'fp', None) is not None
+            and all(hasattr(zout, name) for name in _ZIP_INTERNALS)
+            and hasattr(zipfile.ZipInfo, 'FileHeader'))
+
+
+def copy_raw_member(zin, zout, info):
+    """압축된 데이터를 풀지 않고 그대로 복사
+
+    zipfile 내부 상태가 예상과 다르면 압축을 풀어서 다시 쓴다 (결과는 같고 느리기만 함).
+    """
+    if not _can_copy_raw(zin, zout):
+        zout.writestr(info, zin.read(info))
+        return
+    zin.fp.seek(info.header_offset)
+    header = _LOCAL_HEADER.unpack(zin.fp.read(_LOCAL_HEADER.size))
+    name_length, extra_length = header[-2], header[-1]
+    zin.fp.seek(info.header_offset + _LOCAL_HEADER.size + name_length + extra_length)
+
+    new = zipfile.ZipInfo(info.filename, info.date_time)
+    new.compress_type = info.compress_type
+    new.create_system = info.create_system
+    new.external_attr = info.external_attr
+    # 크기를 헤더에 바로 쓰므로 data descriptor 플래그는 뺀다
+    new.flag_bits = info.flag_bits & ~0x08
+    new.CRC = info.CRC
+    new.compress_size = info.compress_size
+    new.file_size = info.file_size
+
+    # zipfile에는 압축된 데이터를 그대로 쓰는 공개 API가 없어서 내부 상태를 직접 갱신
+    new.header_offset = zout.fp.tell()
+    zout.fp.write(new.FileHeader())
+    remaining = info.compress_size
+    while remaining:
+        chunk = zin.fp.read(min(remaining, 1024 * 1024))
+        if not chunk:
+            raise zipfile.BadZipFile(f"잘린 zip 항목입니다: {info.filename}")
+        zout.fp.write(chunk)
+        remaining -= len(chunk)
+    zout.start_dir = zout.fp.tell()
+    zout.filelist.append(new)
+    zout.NameToInfo[new.filename] = new
+    zout._didModify = True
+
+
+def _rewrite_document(source, target, matcher):
+    """document.xml을 본문 블록 단위로 읽고 쓰면서 단락 강조, 강조한 키워드 수 반환"""
+    count = 0
+    target.write(_XML_DECLARATION)
+    events = etree.iterparse(source, events=('start', 'end'), huge_tree=True,
+                             remove_blank_text=False)
+    # python-docx와 같은 요소 클래스(CT_P 등)로 읽어야 highlight_paragraph를 그대로 쓸 수 있다
+    events.set_element_class_lookup(element_class_lookup)
+
+    root = body = None
+    closing = {}
+    inherited = []
+    for event, elem in events:
+        parent = elem.getparent()
+        if event == 'start':
+            if root is None:
+                root = elem
+                inherited = _namespace_decls(root)
+            elif elem.tag == _BODY and parent is root:
+                body = elem
+            else:
+                continue
+            head, closing[elem] = _open_close_tags(elem)
+            if elem is body:
+                head = _strip_inherited(head, inherited)
+            target.write(head)
+            continue
+
+        if elem is root or elem is body:
+            target.write(closing.pop(elem))
+            continue
+        if parent is not body and parent is not root:
+            continue
+
+        # 본문 바로 아래 단락만 강조 (python-docx의 doc.paragraphs와 같은 범위)
+        if elem.tag == _P and parent is body:
+            count += highlight_paragraph(Paragraph(elem, None), matcher)
+        target.write(_serialize_block(elem, inherited))
+
+        # 다 쓴 블록은 메모리에서 정리
+        elem.clear()
+        parent.remove(elem)
+    return count
+
+
+def highlight_docx_stream(source, target, keyword_notes):
+    """docx(source)를 스트리밍으로 검수해서 target에 쓰기, 강조한 키워드 수 반환
+
+    source/target은 경로나 파일 객체 모두 가능하다.
+    """
+    matcher = compile_keywords(keyword_notes)
+    count = 0
+    with zipfile.ZipFile(source) as zin, \
+            zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            if info.filename == DOCUMENT_PART:
+                new = zipfile.ZipInfo(info.filename, info.date_time)
+                new.compress_type = zipfile.ZIP_DEFLATED
+                new.external_attr = info.external_attr
+                with zin.open(info) as src, zout.open(new, 'w') as dst:
+                    count = _rewrite_document(src, dst, matcher)
+            else:
+                copy_raw_member(zin, zout, info)
+    return count
+
+
+def highlight_docx_file(source_path, target_path, keyword_notes):
+    """경로 버전 (대상 파일은 다 쓴 뒤에 교체)"""
+    tmp_path = f"{target_path}.part"
+    try:
+        with open(source_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            count = highlight_docx_stream(src, dst, keyword_notes)
+        shutil.move(tmp_path, target_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
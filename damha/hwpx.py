@@ -0,0 +1,216 @@
+"""HWPX(한글 XML 문서) 검수 (한글 프로그램/COM 없이 처리)
+
+HWPX는 XML 파일들을 묶은 zip이다. 본문(Contents/section*.xml)의 단락을 docx와 같은
+키워드 검색기로 한 번씩 훑고, 키워드가 걸린 run만 나눠서 글자 모양(charPr)을 바꾼다.
+빨간색/초록색 글자 모양은 원래 글자 모양을 복사해서 header.xml에 추가한다.
+"""
+import os
+import re
+import shutil
+import zipfile
+from copy import deepcopy
+
+from lxml import etree
+
+from .docx_stream import copy_raw_member
+from .matcher import compile_keywords, plan_highlights
+
+HEADER_PART = 'Contents/header.xml'
+_SECTION_PART = re.compile(r'^Contents/section\d+\.xml$')
+MIMETYPE = b'application/hwp+zip'
+
+KEYWORD_COLOR = '#FB4141'
+NOTE_COLOR = '#5CB338'
+
+
+def is_hwpx(data):
+    """bytes가 HWPX 파일인지 (첫 zip 항목인 mimetype 내용으로 판단)"""
+    return data[:4] == b'PK\x03\x04' and MIMETYPE in data[:128]
+
+
+def _local(elem):
+    return etree.QName(elem).localname
+
+
+def _serialize(tree):
+    return etree.tostring(tree, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+class CharShapes:
+    """header.xml의 글자 모양 목록 (키워드/사유용 글자 모양을 필요할 때 추가)"""
+
+    def __init__(self, header):
+        self.header = header
+        self.container = next(header.iter('{*}charProperties'))
+        self.shapes = {elem.get('id'): elem for elem in self.container
+                       if _local(elem) == 'charPr'}
+        self.next_id = max((int(i) for i in self.shapes), default=-1) + 1
+        self._derived = {}
+        self.modified = False
+
+    def derive(self, base_id, kind):
+        """base_id 글자 모양에서 색과 굵기만 바꾼 글자 모양 id (kind: 'keyword' 또는 'note')"""
+        key = (base_id, kind)
+        if key in self._derived:
+            return self._derived[key]
+
+        base = self.shapes.get(base_id)
+        if base is None:
+            base = self.shapes.get('0') or next(iter(self.shapes.values()))
+        shape = deepcopy(base)
+        new_id = str(self.next_id)
+        self.next_id += 1
+        shape.set('id', new_id)
+
+        if kind == 'keyword':
+            shape.set('textColor', KEYWORD_COLOR)
+            self._set_bold(shape, True)
+        else:
+            shape.set('textColor', NOTE_COLOR)
+            self._set_bold(shape, False)
+
+        self.container.append(shape)
+        self.container.set('itemCnt', str(len(self.container)))
+        self.shapes[new_id] = shape
+        self._derived[key] = new_id
+        self.modified = True
+        return new_id
+
+    def _set_bold(self, shape, bold):
+        existing = [child for child in shape if _local(child) == 'bold']
+        if not bold:
+            for child in existing:
+                shape.remove(child)
+            return
+        if existing:
+            return
+        # 네임스페이스는 버전마다 다를 수 있어 charPr 요소의 것을 그대로 쓴다
+        elem = etree.Element(f'{{{etree.QName(shape).namespace}}}bold')
+        # 스키마 순서상 bold는 underline 앞에 온다
+        for i, child in enumerate(shape):
+            if _local(child) in ('underline', 'strikeout', 'outline', 'shadow',
+                                 'emboss', 'engrave', 'supscript', 'subscript'):
+                shape.insert(i, elem)
+                return
+        shape.append(elem)
+
+
+def _is_text_run(run):
+    """글자(hp:t)만 있는 run인지 (표, 그림, 컨트롤, 탭 등이 있으면 False)"""
+    for child in run:
+        if _local(child) != 't' or len(child):
+            return False
+    return True
+
+
+def _run_text(run):
+    return ''.join(''.join(child.itertext()) for child in run if _local(child) == 't')
+
+
+def _set_run_text(run, text):
+    """run의 글자를 text 하나로 교체"""
+    for child in list(run):
+        run.remove(child)
+    t = etree.SubElement(run, f'{{{etree.QName(run).namespace}}}t')
+    t.text = text
+
+
+def _split_run(run, pieces, keyword_notes, shapes):
+    """run 하나를 조각들로 나누기 (첫 조각은 원래 run 요소를 그대로 사용)"""
+    base_id = run.get('charPrIDRef', '0')
+    anchor = run
+    for i, (text, keyword, with_note) in enumerate(pieces):
+        if i:
+            new_run = etree.Element(run.tag, charPrIDRef=base_id)
+            anchor.addnext(new_run)
+            anchor = new_run
+        _set_run_text(anchor, text)
+
+        if keyword is None:
+            continue
+
+        # 키워드 (빨간색, 굵게)
+        anchor.set('charPrIDRef', shapes.derive(base_id, 'keyword'))
+
+        # 키워드가 끝나는 조각 뒤에 사유 추가 (초록색)
+        if with_note and keyword_notes[keyword]:
+            note_run = etree.Element(run.tag, charPrIDRef=shapes.derive(base_id, 'note'))
+            anchor.addnext(note_run)
+            anchor = note_run
+            _set_run_text(note_run, f" {keyword_notes[keyword]}")
+
+
+def highlight_section(section, matcher, shapes):
+    """본문 XML의 모든 단락(표 안 단락 포함)에서 키워드 강조, 강조한 키워드 수 반환"""
+    count = 0
+    for p in list(section.iter('{*}p')):
+        runs = [child for child in p if _local(child) == 'run']
+        if not runs:
+            continue
+        opaque = [not _is_text_run(run) for run in runs]
+        texts = [_run_text(run) for run in runs]
+        found, plan = plan_highlights(texts, opaque, matcher)
+        if not found:
+            continue
+        for i, pieces in plan:
+            _split_run(runs[i], pieces, matcher.keyword_notes, shapes)
+        # 줄 배치 정보는 글자가 바뀌면 맞지 않으므로 지우고 한글이 다시 계산하게 한다
+        for child in list(p):
+            if _local(child) == 'linesegarray':
+                p.remove(child)
+        count += found
+    return count
+
+
+def highlight_hwpx_stream(source, target, keyword_notes):
+    """HWPX(source)를 검수해서 target에 쓰기, 강조한 키워드 수 반환
+
+    source/target은 경로나 파일 객체 모두 가능하다. 본문과 header.xml 외의 항목은
+    압축을 풀지 않고 그대로 복사하며, 항목 순서(mimetype이 처음)도 유지한다.
+    """
+    matcher = compile_keywords(keyword_notes)
+    count = 0
+    with zipfile.ZipFile(source) as zin:
+        names = zin.namelist()
+        if HEADER_PART not in names:
+            raise ValueError("HWPX 파일 형식이 아닙니다.")
+        parser = etree.XMLParser(remove_blank_text=False, huge_tree=True)
+        header = etree.fromstring(zin.read(HEADER_PART), parser)
+        shapes = CharShapes(header)
+
+        sections = {}
+        for name in names:
+            if _SECTION_PART.match(name):
+                section = etree.fromstring(zin.read(name), parser)
+                found = highlight_section(section, matcher, shapes)
+                if found:
+                    sections[name] = section
+                    count += found
+
+        with zipfile.ZipFile(target, 'w') as zout:
+            for info in zin.infolist():
+                if info.filename in sections:
+                    data = _serialize(sections[info.filename])
+                elif info.filename == HEADER_PART and shapes.modified:
+                    data = _serialize(header)
+                else:
+                    copy_raw_member(zin, zout, info)
+                    continue
+                new = zipfile.ZipInfo(info.filename, info.date_time)
+                new.compress_type = zipfile.ZIP_DEFLATED
+                new.external_attr = info.external_attr
+                zout.writestr(new, data)
+    return count
+
+
+def highlight_hwpx_file(source_path, target_path, keyword_notes):
+    """경로 버전 (대상 파일은 다 쓴 뒤에 교체)"""
+    tmp_path = f"{target_path}.part"
+    try:
+        with open(source_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            count = highlight_hwpx_stream(src, dst, keyword_notes)
+        shutil.move(tmp_path, target_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
@@ -0,0 +1,129 @@
+"""키워드 세트 캐시 (만료되면 기존 세트를 쓰면서 백그라운드에서 새로고침)"""
+import os
+import threading
+import time
+from datetime import datetime
+
+from .matcher import compile_keywords
+
+# 키워드 캐시 유지 시간 (초)
+DEFAULT_TTL = int(os.environ.get('DAMHA_KEYWORD_TTL', 300))
+
+
+class KeywordSet:
+    """한 번 불러온 키워드 세트 (교체만 되고 수정되지 않음)"""
+
+    __slots__ = ('keyword_notes', 'matcher', 'version', 'loaded_at')
+
+    def __init__(self, keywords, version, loaded_at):
+        # 키워드 사전 또는 미리 만든 검색기(스냅샷)를 받는다
+        self.matcher = compile_keywords(keywords)
+        self.keyword_notes = self.matcher.keyword_notes
+        self.version = version
+        self.loaded_at = loaded_at
+
+    def describe(self):
+        """화면 표시용 버전 정보"""
+        loaded = datetime.fromtimestamp(self.loaded_at).strftime('%Y-%m-%d %H:%M:%S')
+        return f"키워드 v{self.version} ({len(self.keyword_notes)}개, {loaded})"
+
+
+class KeywordCache:
+    """키워드 세트를 TTL 동안 보관하고, 만료 시 백그라운드에서 교체
+
+    loader는 {키워드: 사유} 딕셔너리나 검색기를 반환하고 실패하면 예외를 발생시켜야 한다.
+    seed(디스크 스냅샷 등)를 주면 시트를 기다리지 않고 바로 사용한다.
+    """
+
+    def __init__(self, loader, ttl=DEFAULT_TTL, seed=None):
+        self.loader = loader
+        self.ttl = ttl
+        self.last_error = None
+        self._current = None
+        # _lock은 상태 확인/교체에만 잠깐 쓰고, 시트를 읽는 동안에는 잡지 않는다
+        self._lock = threading.Lock()
+        # 처음 한 번 직접 불러올 때만 쓰는 잠금 (그때는 쓸 세트가 없으므로 기다림)
+        self._first_load_lock = threading.Lock()
+        self._refreshing = False
+        if seed is not None:
+            loaded_at = getattr(seed, 'created_at', 0)
+            self._current = KeywordSet(seed, 1, loaded_at)
+
+    @property
+    def current(self):
+        """지금 사용 중인 키워드 세트 (없으면 None)"""
+        return self._current
+
+    def get(self):
+        """키워드 세트 반환 (처음 한 번만 직접 불러오고 이후엔 새로고침 중에도 바로 반환)"""
+        current = self._current
+        if current is None:
+            with self._first_load_lock:
+                if self._current is None:
+                    self._install(self.loader())
+                return self._current
+
+        if time.time() - current.loaded_at > self.ttl:
+            self.refresh()
+        return current
+
+    def refresh(self, wait=False):
+        """백그라운드 새로고침 시작 (이미 진행 중이면 무시)"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        thread = threading.Thread(target=self._refresh, daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+
+    def _refresh(self):
+        try:
+            # 시트 읽기는 잠금 없이 (그동안 get/refresh는 기존 세트로 바로 반환)
+            self._install(self.loader())
+        except Exception as e:
+            # 실패하면 기존 세트를 계속 사용
+            self.last_error = e
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _install(self, loaded):
+        """불러온 키워드로 세트 교체 (검색기는 잠금 밖에서 만들고 교체만 잠금 안에서)"""
+        keyword_notes = compile_keywords(loaded).keyword_notes
+        now = time.time()
+        with self._lock:
+            current = self._current
+            if current is not None and current.keyword_notes == keyword_notes:
+                # 내용이 같으면 버전은 그대로 두고 시간만 갱신
+                self._current = KeywordSet(current.matcher, current.version, now)
+            else:
+                version = current.version + 1 if current else 1
+                # 참조 한 번만 바꾸므로 읽는 쪽은 항상 완성된 세트를 본다
+                self._current = KeywordSet(loaded, version, now)
+            self.last_error = None
+
+
+# 프로세스 전체에서 시트(source)마다 하나만 쓰는 키워드 캐시
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+
+def shared_keyword_cache(loader, source=None):
+    """프로세스 전체에서 공유하는 키워드 캐시 (처음 호출할 때 디스크 스냅샷으로 시작)
+
+    Streamlit은 매번 스크립트를 다시 실행하지만 모듈은 다시 불러오지 않으므로,
+    키워드 세트와 검색기는 재실행이나 세션과 상관없이 프로세스에 하나만 있다.
+    source(시트 URL)마다 따로 두고, 디스크 스냅샷도 그 시트의 마지막 것으로 시작한다.
+    """
+    cache = _shared_caches.get(source)
+    if cache is None:
+        with _shared_lock:
+            cache = _shared_caches.get(source)
+            if cache is None:
+                from .snapshot import SnapshotStore
+                store = SnapshotStore(source=source)
+                cache = KeywordCache(store.loader(loader), seed=store.load_latest())
+                _shared_caches[source] = cache
+    return cache
@@ -0,0 +1,128 @@
+"""재검수 기록 (원고 내용과 키워드 세트가 그대로인 파일은 다시 검수하지 않음)
+
+입력 파일 경로와 결과 파일 경로 쌍마다 원고 해시, 키워드 세트 해시, 키워드 수,
+검수 시각을 SQLite에 저장한다. 행을 끝낼 때마다 바로 커밋하므로 중간에 멈춘
+작업은 다음 실행에서 끝난 행을 건너뛰고 이어서 진행된다.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from .snapshot import content_hash
+
+# 임시 폴더 정리 프로그램에 지워지지 않도록 사용자 폴더에 보관
+DEFAULT_PATH = os.environ.get(
+    'DAMHA_MANIFEST', os.path.join(os.path.expanduser('~'), '.damha', 'manifest.sqlite3'))
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS reviews (
+    input_path   TEXT NOT NULL,
+    output_path  TEXT NOT NULL,
+    input_hash   TEXT NOT NULL,
+    input_size   INTEGER NOT NULL,
+    input_mtime  REAL NOT NULL,
+    keyword_hash TEXT NOT NULL,
+    hit_count    INTEGER NOT NULL,
+    reviewed_at  REAL NOT NULL,
+    PRIMARY KEY (input_path, output_path)
+)
+'''
+
+
+# 파일을 해시할 때 한 번에 읽는 크기
+_HASH_CHUNK = 1024 * 1024
+
+
+def file_hash(data):
+    """원고 내용(bytes)의 SHA-256"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    """원고 파일의 SHA-256 (조금씩 읽어서 파일 전체를 메모리에 올리지 않음)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(_HASH_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def keyword_hash(keyword_notes):
+    """키워드 세트 해시 (스냅샷과 같은 방식)"""
+    return content_hash(getattr(keyword_notes, 'keyword_notes', keyword_notes))
+
+
+class ReviewManifest:
+    """검수 기록 저장소 (여러 스레드에서 함께 사용 가능)"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def _entry(self, input_path, output_path):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT input_hash, input_size, input_mtime, keyword_hash, hit_count '
+                'FROM reviews WHERE input_path = ? AND output_path = ?',
+                (input_path, output_path)).fetchone()
+
+    def check(self, input_path, output_path, keywords, digest=None):
+        """다시 검수할 필요가 없으면 지난번 키워드 수, 필요하면 None 반환
+
+        파일 크기와 수정 시각이 같으면 내용을 읽지 않고 건너뛴다. 둘 중 하나가
+        달라도 digest(원고 해시, file_hash/hash_file)를 주면 비교해서 내용이 같으면 건너뛴다.
+        """
+        entry = self._entry(input_path, output_path)
+        if entry is None or not os.path.exists(output_path):
+            return None
+        input_hash, size, mtime, recorded_keywords, hit_count = entry
+        if recorded_keywords != keywords:
+            return None
+
+        stat = os.stat(input_path)
+        if stat.st_size == size and stat.st_mtime == mtime:
+            return hit_count
+        if digest is not None and digest == input_hash:
+            # 내용은 같고 수정 시각만 바뀐 경우 다음에는 읽지 않도록 갱신
+            self._update_stat(input_path, output_path, stat)
+            return hit_count
+        return None
+
+    def _update_stat(self, input_path, output_path, stat):
+        with self._lock:
+            self._conn.execute(
+                'UPDATE reviews SET input_size = ?, input_mtime = ? '
+                'WHERE input_path = ? AND output_path = ?',
+                (stat.st_size, stat.st_mtime, input_path, output_path))
+            self._conn.commit()
+
+    def record(self, input_path, output_path, keywords, digest, hit_count):
+        """검수 완료 기록 (digest: 원고 해시, 바로 커밋)"""
+        stat = os.stat(input_path)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO reviews VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (input_path, output_path, digest, stat.st_size, stat.st_mtime,
+                 keywords, hit_count, time.time()))
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,293 @@
+"""키워드 다중 검색 (Aho-Corasick 자동자)"""
+from array import array
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
+
+from .normalize import normalize_for_match, normalize_keyword, spacing_variants, tail_start
+
+# 글자 없는 개체(그림 등) 자리에 넣는 글자 (U+FFFC OBJECT REPLACEMENT CHARACTER)
+OBJECT_PLACEHOLDER = '\ufffc'
+
+
+class Hits:
+    """검색 결과 (시작/끝 위치와 키워드 번호를 배열로 보관)"""
+
+    __slots__ = ('starts', 'ends', 'ids', 'keywords')
+
+    def __init__(self, keywords):
+        self.starts = array('l')
+        self.ends = array('l')
+        self.ids = array('l')
+        self.keywords = keywords
+
+    def append(self, start, end, kid):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.ids.append(kid)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        """(시작, 끝, 키워드) 순서로 반환"""
+        keywords = self.keywords
+        for start, end, kid in zip(self.starts, self.ends, self.ids):
+            yield start, end, keywords[kid]
+
+
+class KeywordMatcher:
+    """키워드 세트로 한 번 생성해서 여러 문단에 재사용하는 검색기
+
+    normalize가 True면 키워드와 텍스트를 모두 정규화(NFC, 전각 → 반각, 기호 제거,
+    공백 정리)해서 비교하고, 찾은 위치는 원문 기준으로 돌려준다. 키워드의 띄어쓰기
+    자리는 붙여 써도 찾고, 전각 문자만 다른 표현도 같은 키워드로 찾는다.
+    기호만 있는 키워드는 정규화하면 빈 문자열이 되므로 원문에서 그대로 찾는다.
+    """
+
+    normalize = True
+
+    def __init__(self, keyword_notes, normalize=True):
+        self.keyword_notes = keyword_notes
+        self.keywords = list(keyword_notes)
+        self.normalize = normalize
+        # 자동자에 넣는 검색 패턴 (정규화한 키워드와 띄어쓰기 변형)과 패턴별 키워드 번호
+        self.patterns = []
+        self.pattern_keywords = array('l')
+        for kid, keyword in enumerate(self.keywords):
+            variants = spacing_variants(normalize_keyword(keyword)) if normalize else [keyword]
+            for pattern in variants:
+                self.patterns.append(pattern)
+                self.pattern_keywords.append(kid)
+        self.lengths = array('l', (len(p) for p in self.patterns))
+        self.max_length = max(self.lengths, default=0)
+        self._init_exact()
+        self._build()
+
+    def _init_exact(self):
+        """정규화하면 빈 문자열이 되는 키워드(기호만 있는 키워드) 목록 준비"""
+        self.exact = []
+        if self.normalize:
+            self.exact = [(kid, keyword.strip()) for kid, keyword in enumerate(self.keywords)
+                          if keyword.strip() and not normalize_keyword(keyword)]
+        self.max_exact_length = max((len(k) for _, k in self.exact), default=0)
+
+    def _build(self):
+        """trie와 실패 링크 생성"""
+        goto = [{}]
+        out = array('l', [-1])
+
+        for pid, pattern in enumerate(self.patterns):
+            # 기호/공백만 있는 키워드는 원문에서 따로 찾음 (_find_exact)
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(-1)
+                state = nxt
+            # 정규화하면 같아지는 패턴은 먼저 나온 키워드 사용
+            if out[state] == -1:
+                out[state] = pid
+
+        fail = array('l', [0]) * len(goto)
+        # 실패 링크를 따라가며 만나는 다음 출력 상태
+        link = array('l', [-1]) * len(goto)
+
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(ch, 0)
+                fail[nxt] = f
+                link[nxt] = f if out[f] != -1 else link[f]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+        self._link = link
+
+    def _scan(self, text):
+        """텍스트를 한 번 훑으며 (시작, 끝, 패턴 번호) 목록 반환"""
+        goto, fail, out, link, lengths = (
+            self._goto, self._fail, self._out, self._link, self.lengths)
+        found = []
+        state = 0
+        for i, ch in enumerate(text, 1):
+            while True:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if not state:
+                    break
+                state = fail[state]
+
+            s = state if out[state] != -1 else link[state]
+            while s != -1:
+                pid = out[s]
+                found.append((i - lengths[pid], i, pid))
+                s = link[s]
+        return found
+
+    def _prepare(self, text):
+        """검색할 텍스트와 원문 위치 매핑 (정규화하지 않으면 None)"""
+        if not self.normalize:
+            return text, None
+        return normalize_for_match(text)
+
+    def _find_exact(self, text):
+        """기호만 있는 키워드를 원문에서 그대로 찾아 (시작, 끝, 키워드 번호) 목록 반환"""
+        found = []
+        for kid, keyword in self.exact:
+            start = text.find(keyword)
+            while start != -1:
+                found.append((start, start + len(keyword), kid))
+                start = text.find(keyword, start + 1)
+        return found
+
+    def _candidates(self, text):
+        """모든 후보 위치 (원문 기준 (시작, 끝, 키워드 번호), 정렬 전)"""
+        normalized, offsets = self._prepare(text)
+        pattern_keywords = self.pattern_keywords
+        found = []
+        for start, end, pid in self._scan(normalized):
+            if offsets is not None:
+                start, end = offsets.span(start, end)
+            found.append((start, end, pattern_keywords[pid]))
+        if self.exact:
+            found.extend(self._find_exact(text))
+        return found
+
+    def find_all(self, text):
+        """모든 키워드 위치 (겹치는 것 포함, 시작 위치 순)"""
+        hits = Hits(self.keywords)
+        if not self.keywords or not text:
+            return hits
+        found = self._candidates(text)
+        # 띄어쓰기 변형끼리 같은 구간을 찾은 경우는 한 번만
+        for start, end, kid in sorted(set(found)):
+            hits.append(start, end, kid)
+        return hits
+
+    def find_longest(self, text):
+        """겹치지 않는 키워드 위치 (가장 왼쪽, 같은 위치면 가장 긴 키워드)"""
+        hits = Hits(self.keywords)
+        if not self.keywords or not text:
+            return hits
+        found = self._candidates(text)
+        found.sort(key=lambda hit: (hit[0], -hit[1]))
+        pos = 0
+        for start, end, kid in found:
+            if start >= pos:
+                pos = end
+                hits.append(start, end, kid)
+        return hits
+
+    def scan_boundary(self, text):
+        """이 위치 앞에서 시작하는 키워드는 text 안에서 끝까지 찾을 수 있는 위치
+
+        text 뒤에 글자가 더 이어지는 경우(조각 단위 검색)에 쓴다.
+        """
+        if self.normalize:
+            boundary = tail_start(text, self.max_length)
+        else:
+            boundary = max(0, len(text) - self.max_length + 1)
+        if self.max_exact_length:
+            boundary = min(boundary, max(0, len(text) - self.max_exact_length + 1))
+        return boundary
+
+
+def plan_highlights(texts, opaque, matcher):
+    """run 텍스트 목록에서 강조할 위치를 찾아 run별로 나눌 조각 계산
+
+    opaque[i]가 True인 run(그림, 필드 등)에 걸친 키워드는 건너뛴다.
+    반환값은 (강조한 키워드 수, [(run 번호, 조각 목록)])이며 조각은
+    (텍스트, 키워드 또는 None, 키워드가 이 조각에서 끝나는지) 형태다.
+    """
+    # 글자가 없는 그림/표 run을 사이에 두고 키워드가 이어지지 않게 자리 표시 글자를 넣는다
+    texts = [t if t or not o else OBJECT_PLACEHOLDER for t, o in zip(texts, opaque)]
+    text = ''.join(texts)
+    hits = matcher.find_longest(text)
+    if not hits:
+        return 0, []
+
+    # 각 run의 시작 위치
+    bounds = []
+    pos = 0
+    for run_text in texts:
+        bounds.append(pos)
+        pos += len(run_text)
+
+    selected = []
+    for start, end, keyword in hits:
+        first = bisect_right(bounds, start) - 1
+        last = bisect_right(bounds, end - 1) - 1
+        if not any(opaque[first:last + 1]):
+            selected.append((start, end, keyword))
+    if not selected:
+        return 0, []
+
+    plan = []
+    h = 0
+    for i, (run_start, run_text) in enumerate(zip(bounds, texts)):
+        run_end = run_start + len(run_text)
+        # 이 run 앞에서 끝난 키워드 건너뛰기
+        while h < len(selected) and selected[h][1] <= run_start:
+            h += 1
+        if h == len(selected) or selected[h][0] >= run_end:
+            continue
+
+        pieces = []
+        pos = run_start
+        k = h
+        while k < len(selected) and selected[k][0] < run_end:
+            start, end, keyword = selected[k]
+            if start > pos:
+                pieces.append((text[pos:start], None, False))
+            piece_end = min(end, run_end)
+            pieces.append((text[max(start, pos):piece_end], keyword, end <= run_end))
+            pos = piece_end
+            if end > run_end:
+                break
+            k += 1
+        if pos < run_end:
+            pieces.append((text[pos:run_end], None, False))
+        plan.append((i, pieces))
+
+    return len(selected), plan
+
+
+@lru_cache(maxsize=4)
+def _compile(items):
+    return KeywordMatcher(dict(items))
+
+
+# 마지막으로 사용한 (키워드 사전, 검색기)
+_last = (None, None)
+
+
+def compile_keywords(keyword_notes):
+    """키워드 사전으로 검색기 생성 (같은 키워드 세트는 한 번만 생성)
+
+    검색기를 넘기면 그대로 반환하고, 이후 그 검색기의 keyword_notes로
+    호출할 때도 같은 검색기를 돌려준다.
+    """
+    global _last
+    if isinstance(keyword_notes, KeywordMatcher):
+        _last = (keyword_notes.keyword_notes, keyword_notes)
+        return keyword_notes
+    notes, matcher = _last
+    if keyword_notes is notes:
+        return matcher
+    matcher = _compile(tuple(keyword_notes.items()))
+    _last = (keyword_notes, matcher)
+    return matcher
@@ -0,0 +1,171 @@
+"""검색용 텍스트 정규화 (NFC, 전각 → 반각, 기호 제거, 공백 정리) 및 원문 위치 매핑
+
+연속된 공백(전각 공백, 줄바꿈 포함)은 공백 하나로 합치고 기호와 폭 없는 공백은 지우므로
+"부작용  없는", "부작용　없는"(전각 공백), 자모가 분리된 NFD 문자열 등이 모두 같은
+정규화 문자열이 된다. 키워드에 띄어쓰기가 있는 자리만 붙여 쓴 표현도 찾도록
+spacing_variants로 검색 패턴을 미리 만들어 둔다 ("부작용 없는" → "부작용없는"도 검색).
+키워드에 없는 자리의 띄어쓰기는 그대로 구분하므로 "보장"은 "정보 장점"에서 찾지 않는다.
+정규화 문자열의 위치는 OffsetMap으로 원문 위치로 되돌려서 원문 그대로의 구간을 강조한다.
+"""
+import re
+import unicodedata
+from array import array
+from itertools import product
+
+# 검색/정리할 때 지우는 기호
+SYMBOLS = '☑◆●■□△▲▽▼→←↑↓★☆○◎◇※~$'
+
+# 기호 삭제용 변환표 (글자마다 replace를 반복하지 않고 한 번에 처리)
+_STRIP_TABLE = str.maketrans('', '', SYMBOLS)
+
+# 전각 ASCII(！～) → 반각 (전각 공백은 다른 공백과 함께 공백 하나로 합친다)
+_WIDTH_TABLE = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+
+# 검색할 때 지우는 글자 (폭 없는 공백, 기호)
+_INVISIBLE = '\u200b\u200c\u200d\u2060\ufeff'
+_DROP = re.compile(f"[{_INVISIBLE}{re.escape(SYMBOLS)}]")
+_SPACE = re.compile(r"\s")
+# 공백 하나로 합치거나 지우는 구간 (공백이 하나라도 있으면 공백 하나가 된다)
+_GAP = re.compile(f"[\\s{_INVISIBLE}{re.escape(SYMBOLS)}]+")
+
+# 띄어쓰기 조합을 모두 만드는 최대 띄어쓰기 수 (넘으면 모두 띄운 것/모두 붙인 것만)
+MAX_SPACING_VARIANTS = 6
+
+
+def clean_text(text):
+    """텍스트 정리 (기호 제거, 공백 정리)"""
+    return ' '.join(text.translate(_STRIP_TABLE).split())
+
+
+class OffsetMap:
+    """정규화 문자열 위치 → 원문 위치
+
+    starts[k]는 정규화 문자열 k번째 글자가 시작하는 원문 위치이고, ends[k]는 끝나는 위치다.
+    ends가 None이면 모든 글자가 원문 한 글자에서 나온 경우다.
+    """
+
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self, starts, ends=None):
+        self.starts = starts
+        self.ends = ends
+
+    def span(self, start, end):
+        """정규화 문자열의 [start, end) 구간에 해당하는 원문 구간"""
+        last = end - 1
+        return self.starts[start], (self.ends[last] if self.ends is not None
+                                    else self.starts[last] + 1)
+
+
+def _is_attached(ch):
+    """앞 글자와 합성되는 글자인지 (결합 문자, 한글 중성·종성 자모)"""
+    code = ord(ch)
+    return bool(unicodedata.combining(ch)) or 0x1160 <= code <= 0x11FF or 0xD7B0 <= code <= 0xD7FF
+
+
+def _nfc_units(text):
+    """NFC 합성 단위(기준 글자 + 결합 문자/한글 중성·종성 자모)로 나눈 (시작, 끝) 목록"""
+    bounds = []
+    start = 0
+    for i in range(1, len(text)):
+        if _is_attached(text[i]):
+            continue
+        bounds.append((start, i))
+        start = i
+    if text:
+        bounds.append((start, len(text)))
+    return bounds
+
+
+def _normalize_decomposed(text):
+    """NFC가 아닌 텍스트 정규화 (합성 단위마다 원문 구간 기록)"""
+    chars = []
+    starts = array('l')
+    ends = array('l')
+    for start, end in _nfc_units(text):
+        for ch in unicodedata.normalize('NFC', text[start:end]):
+            if _DROP.match(ch):
+                continue
+            if _SPACE.match(ch):
+                # 앞 글자가 이미 공백이면 합침 (사이의 기호는 지워졌으므로 함께 합쳐짐)
+                if chars and chars[-1] == ' ':
+                    continue
+                ch = ' '
+            chars.append(ch)
+            starts.append(start)
+            ends.append(end)
+    return ''.join(chars).translate(_WIDTH_TABLE), OffsetMap(starts, ends)
+
+
+def normalize_for_match(text):
+    """검색용 정규화 문자열과 OffsetMap 반환"""
+    if not unicodedata.is_normalized('NFC', text):
+        return _normalize_decomposed(text)
+
+    # 공백/기호 구간 사이만 이어 붙이므로 글자 단위 반복 없이 위치를 기록한다
+    parts = []
+    starts = array('l')
+    pos = 0
+    for m in _GAP.finditer(text):
+        if m.start() > pos:
+            parts.append(text[pos:m.start()])
+            starts.extend(range(pos, m.start()))
+        # 공백이 있는 구간은 공백 하나 (위치는 첫 공백), 기호만 있으면 지움
+        space = _SPACE.search(text, m.start(), m.end())
+        if space:
+            parts.append(' ')
+            starts.append(space.start())
+        pos = m.end()
+    if pos < len(text):
+        parts.append(text[pos:])
+        starts.extend(range(pos, len(text)))
+    return ''.join(parts).translate(_WIDTH_TABLE), OffsetMap(starts)
+
+
+def normalize_keyword(keyword):
+    """키워드를 검색용으로 정규화 (앞뒤 공백 제외, 기호만 있으면 빈 문자열)"""
+    return normalize_for_match(keyword)[0].strip(' ')
+
+
+def spacing_variants(pattern):
+    """정규화한 키워드의 띄어쓰기 자리마다 띄우거나 붙인 검색 패턴 목록 (원래 패턴 먼저)
+
+    띄어쓰기가 MAX_SPACING_VARIANTS개를 넘으면 모두 띄운 것과 모두 붙인 것만 만든다.
+    """
+    words = pattern.split(' ')
+    if len(words) == 1:
+        return [pattern]
+    gaps = len(words) - 1
+    if gaps > MAX_SPACING_VARIANTS:
+        return [pattern, ''.join(words)]
+    variants = []
+    for joiners in product((' ', ''), repeat=gaps):
+        variant = words[0] + ''.join(j + w for j, w in zip(joiners, words[1:]))
+        variants.append(variant)
+    return variants
+
+
+def tail_start(text, count):
+    """text 끝에서부터 검색에 쓰이는 글자(합성 단위) count개가 시작하는 위치 (모자라면 0)
+
+    지우는 글자(기호)는 세지 않고, 이어진 공백은 하나로 센다. 이 위치 앞에서 시작하는
+    키워드는 정규화해서 count글자 이하라면 text 안에서 끝까지 찾을 수 있다.
+    """
+    if count <= 0:
+        return len(text)
+    seen = 0
+    in_space = False
+    for i in range(len(text) - 1, -1, -1):
+        ch = text[i]
+        if _is_attached(ch) or _DROP.match(ch):
+            continue
+        if _SPACE.match(ch):
+            if in_space:
+                continue
+            in_space = True
+        else:
+            in_space = False
+        seen += 1
+        if seen == count:
+            return i
+    return 0
@@ -0,0 +1,305 @@
+"""CLOVA OCR 호출 (연결 재사용, 여러 이미지 동시 처리)"""
+import base64
+import os
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import DEFAULT_BATCH_IMAGES, DEFAULT_CONCURRENCY
+from .ocr_cache import image_digest
+from .ocr_image import (DEFAULT_MAX_DIMENSION, prepare_image, restore_box,
+                        restore_coordinates, restore_orientation)
+from .normalize import clean_text
+from .ocr_layout import build_layout
+
+# 요청 하나의 제한 시간 (초)
+DEFAULT_TIMEOUT = float(os.environ.get('DAMHA_OCR_TIMEOUT', 60))
+# 묶음 요청 하나의 최대 이미지 데이터 크기 (base64 기준 바이트)
+DEFAULT_BATCH_BYTES = int(os.environ.get('DAMHA_OCR_BATCH_BYTES', 10 * 1024 * 1024))
+
+
+class OCRError(Exception):
+    """OCR API 호출 실패"""
+
+
+class OCRResult:
+    """이미지 한 장의 OCR 결과
+
+    words는 단어별 텍스트, 줄 번호, 위치 목록이다. 줄 번호와 순서는 text와 같고
+    (보이는 방향 기준), box는 result와 같은 원본 파일의 픽셀 좌표다.
+    """
+
+    __slots__ = ('text', 'result', 'words', 'original_bytes', 'sent_bytes', 'cached')
+
+    def __init__(self, text, result, original_bytes, sent_bytes, cached, words=()):
+        self.text = text
+        self.result = result
+        self.words = words
+        self.original_bytes = original_bytes
+        self.sent_bytes = sent_bytes
+        self.cached = cached
+
+    @property
+    def saved_bytes(self):
+        """전처리로 줄인 전송 바이트 수 (캐시에서 가져왔으면 원본 전체)"""
+        return self.original_bytes - self.sent_bytes
+
+
+def pack_batches(sizes, max_images=DEFAULT_BATCH_IMAGES, max_bytes=DEFAULT_BATCH_BYTES):
+    """이미지 크기 목록을 순서대로 묶음 요청(인덱스 목록)들로 나누기
+
+    묶음마다 이미지 수는 max_images, 데이터 크기 합은 max_bytes를 넘지 않는다.
+    혼자서 max_bytes를 넘는 이미지는 단독 요청으로 보낸다.
+    """
+    batches = []
+    current = []
+    total = 0
+    for i, size in enumerate(sizes):
+        if current and (len(current) >= max_images or total + size > max_bytes):
+            batches.append(current)
+            current = []
+            total = 0
+        current.append(i)
+        total += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def split_batch_result(result, names):
+    """묶음 응답을 이미지별 응답으로 나누기 ({이름: 응답 또는 OCRError})"""
+    images = {image.get('name'): image for image in result.get('images', [])}
+    common = {key: value for key, value in result.items() if key != 'images'}
+    split = {}
+    for name in names:
+        image = images.get(name)
+        if image is None:
+            split[name] = OCRError(f"응답에 이미지 결과가 없습니다: {name}")
+        elif image.get('inferResult', 'SUCCESS') != 'SUCCESS':
+            split[name] = OCRError(f"OCR 실패: {image.get('message') or image.get('inferResult')}")
+        else:
+            split[name] = dict(common, images=[image])
+    return split
+
+
+def build_lines(result):
+    """OCR 응답의 필드들을 줄 단위 텍스트로 합치기"""
+    return build_layout(result, clean=clean_text, with_words=False)[0]
+
+
+class ClovaOCR:
+    """CLOVA OCR 클라이언트
+
+    하나의 Session(keep-alive 연결 풀)을 계속 쓰므로 요청마다 TLS 연결을 새로 맺지 않는다.
+    cache(OCRCache)를 주면 같은 이미지는 다시 API를 호출하지 않는다.
+    이미지는 보내기 전에 max_dimension 이하로 줄이고, 응답 좌표는 원본 기준으로 되돌린다.
+    batch_images가 2 이상이면 작은 이미지 여러 장을 요청 하나의 images 배열에 묶어 보낸다.
+    """
+
+    def __init__(self, api_url, secret_key, concurrency=DEFAULT_CONCURRENCY,
+                 timeout=DEFAULT_TIMEOUT, cache=None, max_dimension=DEFAULT_MAX_DIMENSION,
+                 batch_images=DEFAULT_BATCH_IMAGES, batch_bytes=DEFAULT_BATCH_BYTES):
+        self.api_url = api_url
+        self.cache = cache
+        self.max_dimension = max_dimension
+        self.batch_images = max(1, batch_images)
+        self.batch_bytes = batch_bytes
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            'X-OCR-SECRET': secret_key,
+            'Content-Type': 'application/json'
+        })
+        # 동시 요청 수만큼 연결을 열어 두고 재사용
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _post(self, images):
+        """images 배열로 API 호출해서 응답(JSON) 반환 (실패 시 OCRError)"""
+        request_json = {
+            'images': images,
+            'requestId': str(uuid.uuid4()),
+            'version': 'V2',
+            'timestamp': int(round(time.time() * 1000))
+        }
+
+        try:
+            response = self.session.post(self.api_url, json=request_json, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise OCRError(f"API 요청 실패: {str(e)}") from e
+
+        if response.status_code != 200:
+            raise OCRError(f"API 오류: {response.status_code}\n오류 메시지: {response.text}")
+        return response.json()
+
+    def recognize(self, image_bytes, format='jpg'):
+        """이미지 한 장을 OCR해서 응답(JSON) 반환 (실패 시 OCRError)"""
+        return self._post([{
+            'format': format,
+            'name': 'demo',
+            'data': base64.b64encode(image_bytes).decode()
+        }])
+
+    def _prepare(self, image_bytes):
+        try:
+            return prepare_image(image_bytes, self.max_dimension)
+        except Exception as e:
+            raise OCRError(f"이미지를 열 수 없습니다: {str(e)}") from e
+
+    def _cached(self, image_bytes, digest):
+        """캐시에 있으면 OCRResult 반환 (없으면 None)"""
+        if self.cache is None:
+            return None
+        entry = self.cache.get(digest)
+        # 단어 목록이 없는 예전 항목은 다시 OCR
+        if entry is None or entry.get('words') is None:
+            return None
+        words = [dict(word, box=tuple(word['box'])) for word in entry['words']]
+        return OCRResult(entry['text'], entry['result'], len(image_bytes), 0, True, words)
+
+    def _finish(self, image_bytes, digest, result, prepared):
+        """원본 좌표로 되돌린 응답에서 텍스트를 만들고 캐시에 저장
+
+        줄과 단어 순서는 보이는 방향(EXIF 회전 반영) 기준으로 만들고, 저장하는 좌표(응답,
+        단어 위치)는 원본 파일의 픽셀 좌표다.
+        """
+        result = restore_coordinates(result, prepared.scale)
+        text, words = build_layout(result, clean=clean_text)
+        for word in words:
+            word['box'] = restore_box(word['box'], prepared.orientation, prepared.dimensions)
+        result = restore_orientation(result, prepared.orientation, prepared.dimensions)
+        if self.cache is not None:
+            self.cache.put(digest, result, text, words)
+        return OCRResult(text, result, len(image_bytes), len(prepared.data), False, words)
+
+    def extract(self, image_bytes, digest=None):
+        """이미지 한 장 OCR해서 OCRResult 반환 (캐시 우선)"""
+        digest = digest or image_digest(image_bytes)
+        cached = self._cached(image_bytes, digest)
+        if cached is not None:
+            return cached
+
+        prepared = self._prepare(image_bytes)
+        result = self.recognize(prepared.data, prepared.format)
+        return self._finish(image_bytes, digest, result, prepared)
+
+    def extract_text(self, image_bytes):
+        """이미지 한 장의 텍스트 추출"""
+        return self.extract(image_bytes).text
+
+    def _extract_batch(self, jobs):
+        """(원본, digest, 전처리 이미지) 여러 개를 요청 하나로 OCR, 이미지별 결과/오류 목록 반환"""
+        names = [f"image{i}" for i in range(len(jobs))]
+        images = [{'format': prepared.format,
+                   'name': name,
+                   'data': base64.b64encode(prepared.data).decode()}
+                  for name, (_, _, prepared) in zip(names, jobs)]
+        split = split_batch_result(self._post(images), names)
+
+        outcomes = []
+        for name, (image_bytes, digest, prepared) in zip(names, jobs):
+            result = split[name]
+            if isinstance(result, Exception):
+                outcomes.append(result)
+            else:
+                outcomes.append(self._finish(image_bytes, digest, result, prepared))
+        return outcomes
+
+    def _submit_packed(self, pool, jobs):
+        """캐시에 없는 이미지들을 전처리 후 묶음 요청으로 보내기
+
+        (이미지별 Future 목록, 묶음 요청 Future 목록) 반환.
+        """
+        futures = [Future() for _ in jobs]
+        prepared = list(pool.map(self._try_prepare, [image_bytes for image_bytes, _ in jobs]))
+
+        ready = []
+        for future, (image_bytes, digest), item in zip(futures, jobs, prepared):
+            if isinstance(item, Exception):
+                future.set_exception(item)
+            else:
+                ready.append((future, (image_bytes, digest, item)))
+
+        batch_requests = []
+        sizes = [(len(item[2].data) + 2) // 3 * 4 for _, item in ready]
+        for batch in pack_batches(sizes, self.batch_images, self.batch_bytes):
+            targets = [ready[i][0] for i in batch]
+            request = pool.submit(self._extract_batch, [ready[i][1] for i in batch])
+            request.add_done_callback(
+                lambda request, targets=targets: _resolve_batch(request, targets))
+            batch_requests.append(request)
+        return futures, batch_requests
+
+    def _try_prepare(self, image_bytes):
+        try:
+            return self._prepare(image_bytes)
+        except OCRError as e:
+            return e
+
+    def extract_many(self, images):
+        """여러 이미지를 동시에 OCR
+
+        결과는 업로드 순서대로 (OCRResult 또는 None, 오류 또는 None)를 하나씩 내보낸다.
+        앞 이미지가 끝나는 즉시 내보내므로 화면에 바로 표시할 수 있다.
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            # 같은 이미지가 여러 번 올라오면 한 번만 요청
+            order = []
+            seen = set()
+            by_digest = {}
+            packed = []
+            batch_requests = []
+            for image_bytes in images:
+                digest = image_digest(image_bytes)
+                order.append(digest)
+                if digest in seen:
+                    continue
+                seen.add(digest)
+                cached = self._cached(image_bytes, digest)
+                if cached is not None:
+                    by_digest[digest] = Future()
+                    by_digest[digest].set_result(cached)
+                elif self.batch_images > 1:
+                    packed.append((image_bytes, digest))
+                else:
+                    by_digest[digest] = pool.submit(self.extract, image_bytes, digest)
+
+            if packed:
+                image_futures, batch_requests = self._submit_packed(pool, packed)
+                for (_, digest), future in zip(packed, image_futures):
+                    by_digest[digest] = future
+            futures = [by_digest[digest] for digest in order]
+
+            try:
+                for future in futures:
+                    try:
+                        yield future.result(), None
+                    except Exception as e:
+                        yield None, e
+            finally:
+                # 중간에 멈추면 아직 시작하지 않은 요청은 보내지 않음
+                for future in batch_requests + futures:
+                    future.cancel()
+
+    def close(self):
+        self.session.close()
+
+
+def _resolve_batch(request, targets):
+    """묶음 요청이 끝나면 이미지별 Future에 결과 전달"""
+    try:
+        outcomes = request.result()
+    except BaseException as e:
+        outcomes = [e] * len(targets)
+    for future, outcome in zip(targets, outcomes):
+        if future.cancelled():
+            continue
+        if isinstance(outcome, BaseException):
+            future.set_exception(outcome)
+        else:
+            future.set_result(outcome)
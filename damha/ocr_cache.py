@@ -0,0 +1,140 @@
+"""OCR 결과 캐시 (이미지 내용의 SHA-256 기준, 메모리 + 선택적 디스크, 크기 제한 LRU)"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# 메모리 캐시 최대 크기 (바이트)
+DEFAULT_MAX_MEMORY = int(os.environ.get('DAMHA_OCR_CACHE_SIZE', 64 * 1024 * 1024))
+# 디스크 캐시 폴더 (비어 있으면 메모리에만 보관)
+DEFAULT_DIRECTORY = os.environ.get('DAMHA_OCR_CACHE_DIR') or None
+# 디스크 캐시 최대 크기 (바이트)
+DEFAULT_MAX_DISK = int(os.environ.get('DAMHA_OCR_CACHE_DISK_SIZE', 512 * 1024 * 1024))
+
+
+def image_digest(image_bytes):
+    """이미지 내용의 SHA-256"""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class OCRCache:
+    """OCR 응답(필드 JSON)과 합친 텍스트를 보관하는 캐시
+
+    항목은 {'result': 응답 JSON, 'text': 텍스트} 딕셔너리이며, 메모리와 디스크
+    모두 오래 쓰지 않은 항목부터 지운다.
+    """
+
+    def __init__(self, max_memory=DEFAULT_MAX_MEMORY, directory=DEFAULT_DIRECTORY,
+                 max_disk=DEFAULT_MAX_DISK):
+        self.max_memory = max_memory
+        self.directory = directory
+        self.max_disk = max_disk
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._memory = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, digest):
+        """캐시된 항목 반환 (없으면 None)"""
+        with self._lock:
+            item = self._entries.get(digest)
+            if item is not None:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return item[0]
+
+        entry = self._read_disk(digest)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # 디스크에서 찾은 항목은 메모리에도 올려 둔다
+        self._remember(digest, entry, self._encode(entry))
+        return entry
+
+    def put(self, digest, result, text, words=None):
+        """OCR 응답, 텍스트, 단어 목록 저장"""
+        entry = {'result': result, 'text': text, 'words': words}
+        data = self._encode(entry)
+        self._remember(digest, entry, data)
+        if self.directory:
+            self._write_disk(digest, data)
+        return entry
+
+    def _encode(self, entry):
+        return json.dumps(entry, ensure_ascii=False).encode('utf-8')
+
+    def _remember(self, digest, entry, data):
+        size = len(data)
+        if size > self.max_memory:
+            return
+        with self._lock:
+            old = self._entries.pop(digest, None)
+            if old is not None:
+                self._memory -= old[1]
+            self._entries[digest] = (entry, size)
+            self._memory += size
+            while self._memory > self.max_memory:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._memory -= evicted
+
+    def _read_disk(self, digest):
+        if not self.directory:
+            return None
+        path = self._path(digest)
+        try:
+            with open(path, 'rb') as f:
+                entry = json.loads(f.read().decode('utf-8'))
+            # 마지막 사용 시각 갱신 (디스크 LRU 기준)
+            os.utime(path)
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, digest, data):
+        path = self._path(digest)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            # 디스크 캐시는 보조 수단이므로 실패해도 무시
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._prune_disk()
+
+    def _prune_disk(self):
+        """디스크 캐시가 최대 크기를 넘으면 오래 쓰지 않은 파일부터 삭제"""
+        files = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_disk:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,147 @@
+"""OCR 전 이미지 전처리 (실제 형식 확인, 축소, JPEG 재인코딩)"""
+import io
+import os
+
+from PIL import Image, ImageOps
+
+# 긴 변 최대 길이 (픽셀, 이보다 크면 축소)
+DEFAULT_MAX_DIMENSION = int(os.environ.get('DAMHA_OCR_MAX_DIMENSION', 2000))
+# 재인코딩 JPEG 품질
+DEFAULT_JPEG_QUALITY = int(os.environ.get('DAMHA_OCR_JPEG_QUALITY', 85))
+
+# PIL 형식 이름 -> CLOVA OCR format 값
+_API_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'TIFF': 'tiff'}
+
+# EXIF 회전 정보 태그
+_ORIENTATION = 0x0112
+
+# EXIF 회전 값별로, 회전을 반영한(보이는) 이미지의 좌표 (x, y)를 원본 파일의 픽셀 좌표로
+# 되돌리는 함수 (w, h는 원본 파일의 가로, 세로)
+_INVERSE_ORIENTATION = {
+    2: lambda x, y, w, h: (w - x, y),
+    3: lambda x, y, w, h: (w - x, h - y),
+    4: lambda x, y, w, h: (x, h - y),
+    5: lambda x, y, w, h: (y, x),
+    6: lambda x, y, w, h: (y, h - x),
+    7: lambda x, y, w, h: (w - y, h - x),
+    8: lambda x, y, w, h: (w - y, x),
+}
+
+
+class PreparedImage:
+    """OCR API로 보낼 이미지 (원본 좌표로 되돌리기 위한 배율, EXIF 회전 값, 원본 크기 포함)"""
+
+    __slots__ = ('data', 'format', 'scale', 'original_format', 'original_size',
+                 'orientation', 'dimensions')
+
+    def __init__(self, data, format, scale, original_format, original_size,
+                 orientation=1, dimensions=None):
+        self.data = data
+        self.format = format
+        self.scale = scale
+        self.original_format = original_format
+        self.original_size = original_size
+        self.orientation = orientation
+        self.dimensions = dimensions
+
+    @property
+    def saved_bytes(self):
+        """전처리로 줄어든 바이트 수"""
+        return self.original_size - len(self.data)
+
+
+def _to_rgb(image):
+    """JPEG로 저장할 수 있게 RGB로 변환 (투명 영역은 흰색 배경)"""
+    if image.mode == 'RGB':
+        return image
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def prepare_image(image_bytes, max_dimension=DEFAULT_MAX_DIMENSION,
+                  quality=DEFAULT_JPEG_QUALITY):
+    """이미지를 OCR용으로 줄이기
+
+    긴 변이 max_dimension보다 크면 축소하고 JPEG로 다시 저장한다. 결과가
+    원본보다 크면 (이미 작은 JPEG 등) 원본을 실제 형식 그대로 보낸다.
+    EXIF 회전 정보가 있으면 회전한(보이는 방향) 이미지를 보낸다.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    original_format = image.format
+    dimensions = image.size
+    orientation = image.getexif().get(_ORIENTATION, 1)
+    if orientation not in _INVERSE_ORIENTATION:
+        orientation = 1
+
+    # 휴대폰 사진의 회전 정보(EXIF) 반영
+    image = ImageOps.exif_transpose(image)
+    rotated = orientation != 1
+
+    scale = 1.0
+    longest = max(image.size)
+    if longest > max_dimension:
+        scale = max_dimension / longest
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+
+    output = io.BytesIO()
+    _to_rgb(image).save(output, format='JPEG', quality=quality, optimize=True)
+    data = output.getvalue()
+
+    api_format = _API_FORMATS.get(original_format)
+    if scale == 1.0 and not rotated and api_format and len(data) >= len(image_bytes):
+        return PreparedImage(image_bytes, api_format, 1.0, original_format, len(image_bytes),
+                             orientation, dimensions)
+    return PreparedImage(data, 'jpg', scale, original_format, len(image_bytes),
+                         orientation, dimensions)
+
+
+def _vertices(result):
+    for image in result.get('images', []):
+        for field in image.get('fields', []):
+            yield from field.get('boundingPoly', {}).get('vertices', [])
+
+
+def restore_coordinates(result, scale):
+    """축소한 이미지 기준의 boundingPoly 좌표를 축소 전 크기로 변환
+
+    방향은 그대로(EXIF 회전을 반영한 보이는 방향)이다. 원본 파일의 픽셀 좌표가
+    필요하면 restore_orientation을 이어서 적용한다.
+    """
+    if scale == 1.0:
+        return result
+    for vertex in _vertices(result):
+        for axis in ('x', 'y'):
+            if axis in vertex:
+                vertex[axis] = vertex[axis] / scale
+    return result
+
+
+def restore_orientation(result, orientation, dimensions):
+    """보이는 방향 기준의 boundingPoly 좌표를 원본 파일(EXIF 회전 전)의 픽셀 좌표로 변환
+
+    dimensions는 원본 파일의 (가로, 세로)다.
+    """
+    inverse = _INVERSE_ORIENTATION.get(orientation)
+    if inverse is None:
+        return result
+    width, height = dimensions
+    for vertex in _vertices(result):
+        if 'x' in vertex and 'y' in vertex:
+            vertex['x'], vertex['y'] = inverse(vertex['x'], vertex['y'], width, height)
+    return result
+
+
+def restore_box(box, orientation, dimensions):
+    """보이는 방향 기준의 사각형 (x0, y0, x1, y1)을 원본 파일의 픽셀 좌표로 변환"""
+    inverse = _INVERSE_ORIENTATION.get(orientation)
+    if inverse is None:
+        return box
+    width, height = dimensions
+    x0, y0 = inverse(box[0], box[1], width, height)
+    x1, y1 = inverse(box[2], box[3], width, height)
+    return (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
@@ -0,0 +1,108 @@
+"""OCR 필드 배치 분석 (NumPy로 줄 나누기, 단어별 위치 정보)"""
+import numpy as np
+
+# 같은 줄로 볼 세로 간격 (글자 높이 대비 비율)
+LINE_GAP_RATIO = 0.5
+
+
+def _field_arrays(fields):
+    """필드 목록에서 (텍스트 목록, 꼭짓점 배열 (n, 4, 2)) 추출"""
+    texts = []
+    coords = []
+    for field in fields:
+        if 'inferText' not in field:
+            continue
+        vertices = field.get('boundingPoly', {}).get('vertices', [])
+        if len(vertices) != 4:
+            continue
+        texts.append(field['inferText'])
+        for v in vertices:
+            coords.append(v.get('x', 0))
+            coords.append(v.get('y', 0))
+    # 중첩 리스트보다 평평한 목록을 한 번에 배열로 바꾸는 편이 훨씬 빠르다
+    return texts, np.array(coords, dtype=np.float64).reshape(-1, 4, 2)
+
+
+def _skew_angle(polygons):
+    """단어 윗변 기울기의 중앙값 (이미지가 기울어진 각도, 라디안)"""
+    # CLOVA 꼭짓점 순서: 왼쪽 위, 오른쪽 위, 오른쪽 아래, 왼쪽 아래
+    top = polygons[:, 1] - polygons[:, 0]
+    wide = top[:, 0] > 0
+    if not wide.any():
+        return 0.0
+    return float(np.median(np.arctan2(top[wide, 1], top[wide, 0])))
+
+
+def cluster_rows(polygons):
+    """단어들을 줄로 묶기, (줄 번호 배열, 줄 방향 좌표 배열) 반환
+
+    기울어진 이미지는 각도만큼 되돌린 좌표로 비교하고, 줄 간격 기준은
+    고정 픽셀 대신 글자 높이의 중앙값에 비례해서 정한다.
+    """
+    n = len(polygons)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    angle = _skew_angle(polygons)
+    cos, sin = np.cos(angle), np.sin(angle)
+    centers = polygons.mean(axis=1)
+    # 기울기를 없앤 좌표계 (along: 줄 방향, across: 줄에 수직)
+    along = centers[:, 0] * cos + centers[:, 1] * sin
+    across = centers[:, 1] * cos - centers[:, 0] * sin
+
+    heights = np.linalg.norm(polygons[:, 3] - polygons[:, 0], axis=1)
+    threshold = max(float(np.median(heights)) * LINE_GAP_RATIO, 1.0)
+
+    # 위에서부터 정렬해서 간격이 기준보다 벌어지는 곳마다 새 줄
+    order = np.argsort(across, kind='stable')
+    breaks = np.diff(across[order]) > threshold
+    rows = np.empty(n, dtype=np.int64)
+    rows[order] = np.concatenate(([0], np.cumsum(breaks)))
+    return rows, along
+
+
+def build_layout(result, clean=None, with_words=True):
+    """OCR 응답을 줄 단위 텍스트와 단어별 위치 정보로 변환
+
+    반환값은 (텍스트, 단어 목록)이며 단어는 {'text', 'line', 'box': (x0, y0, x1, y1)}
+    딕셔너리다. box는 응답 좌표 그대로이고, line은 텍스트에서의 줄 번호(0부터)다.
+    clean을 주면 각 단어와 줄에 적용한다. 빈 단어는 버린다.
+    with_words가 False면 단어 목록은 만들지 않고 빈 목록을 반환한다.
+    """
+    lines = []
+    words = []
+    for image in result.get('images', []):
+        texts, polygons = _field_arrays(image.get('fields', []))
+        if clean is not None:
+            texts = [clean(text) for text in texts]
+        keep = [i for i, text in enumerate(texts) if text]
+        if not keep:
+            continue
+        texts = [texts[i] for i in keep]
+        polygons = polygons[keep]
+
+        rows, along = cluster_rows(polygons)
+        if with_words:
+            mins = polygons.min(axis=1).tolist()
+            maxs = polygons.max(axis=1).tolist()
+
+        # 줄 순서대로, 줄 안에서는 왼쪽부터
+        rows = rows.tolist()
+        last_row = None
+        for i in np.lexsort((along, rows)).tolist():
+            if rows[i] != last_row:
+                lines.append([])
+                last_row = rows[i]
+            lines[-1].append(texts[i])
+            if with_words:
+                words.append({
+                    'text': texts[i],
+                    'line': len(lines) - 1,
+                    'box': (mins[i][0], mins[i][1], maxs[i][0], maxs[i][1])
+                })
+
+    text_lines = []
+    for parts in lines:
+        line = ' '.join(parts)
+        text_lines.append(clean(line) if clean is not None else line)
+    return '\n'.join(text_lines), words
@@ -0,0 +1,339 @@
+"""원고(txt/docx) 검수 공용 로직"""
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import deepcopy
+import multiprocessing
+import time
+from contextlib import nullcontext
+
+from docx import Document
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.shared import Pt, RGBColor
+from docx.text.run import Run
+
+from .config import DEFAULT_WORKERS, STREAM_THRESHOLD
+from .matcher import compile_keywords, plan_highlights
+
+FONT_NAME = "맑은 고딕"
+KEYWORD_COLOR = RGBColor(251, 65, 65)
+NOTE_COLOR = RGBColor(92, 179, 56)
+
+
+def set_base_font(doc):
+    """기본 스타일(Normal) 글꼴을 맑은 고딕으로 (한글 글꼴 포함, run마다 넣지 않음)"""
+    style = doc.styles['Normal']
+    style.font.name = FONT_NAME
+    style.element.rPr.rFonts.set(qn('w:eastAsia'), FONT_NAME)
+
+
+# 글자만 들어 있는 run에 올 수 있는 요소 (이외의 요소가 있으면 run을 나누지 않음)
+_TEXT_TAGS = {qn('w:rPr'), qn('w:t'), qn('w:tab'), qn('w:cr'),
+              qn('w:noBreakHyphen'), qn('w:lastRenderedPageBreak')}
+_BR = qn('w:br')
+_BR_TYPE = qn('w:type')
+
+
+def _is_text_run(r):
+    """글자/탭/줄바꿈만 있는 run인지 (그림, 필드, 페이지 나눔 등이 있으면 False)"""
+    for child in r:
+        if child.tag in _TEXT_TAGS:
+            continue
+        if child.tag == _BR and child.get(_BR_TYPE, 'textWrapping') == 'textWrapping':
+            continue
+        return False
+    return True
+
+
+def _split_run(run, pieces, keyword_notes):
+    """run 하나를 (텍스트, 키워드 또는 None, 사유 붙일지) 조각들로 나누기
+
+    첫 조각은 원래 run 요소를 그대로 쓰고, 나머지는 서식(rPr)만 복사해서 만든다.
+    """
+    r = run._r
+    # 첫 조각의 서식을 바꾸기 전에 원래 서식을 복사해 둔다
+    rPr = deepcopy(r.rPr) if r.rPr is not None else None
+    anchor = r
+    for i, (text, keyword, with_note) in enumerate(pieces):
+        if i:
+            new_r = OxmlElement('w:r')
+            if rPr is not None:
+                new_r.append(deepcopy(rPr))
+            anchor.addnext(new_r)
+            anchor = new_r
+        piece = Run(anchor, run._parent)
+        piece.text = text
+
+        if keyword is None:
+            continue
+
+        # 키워드 (빨간색으로, 굵게)
+        piece.font.color.rgb = KEYWORD_COLOR
+        piece.bold = True
+
+        # 키워드가 끝나는 조각 뒤에 노트 추가
+        if with_note and keyword_notes[keyword]:
+            note_r = OxmlElement('w:r')
+            if rPr is not None:
+                note_r.append(deepcopy(rPr))
+            anchor.addnext(note_r)
+            anchor = note_r
+            note_run = Run(note_r, run._parent)
+            note_run.text = f" {keyword_notes[keyword]}"
+            note_run.font.color.rgb = NOTE_COLOR
+            note_run.bold = None
+
+
+def highlight_paragraph(paragraph, matcher):
+    """단락에서 키워드가 걸린 run만 나눠서 강조 (나머지 run은 그대로 유지)
+
+    겹치는 키워드는 가장 왼쪽, 같은 위치면 가장 긴 키워드를 사용한다.
+    반환값은 강조한 키워드 수.
+    """
+    runs = [Run(r, paragraph) for r in paragraph._p.xpath('./w:r | ./w:hyperlink/w:r')]
+    if not runs:
+        return 0
+
+    texts = [run.text for run in runs]
+    # 그림 등 글자가 아닌 요소가 있는 run은 나누지 않음
+    opaque = [not _is_text_run(run._r) for run in runs]
+    count, plan = plan_highlights(texts, opaque, matcher)
+    for i, pieces in plan:
+        _split_run(runs[i], pieces, matcher.keyword_notes)
+    return count
+
+
+def highlight_document(doc, keyword_notes):
+    """문서의 모든 단락에서 키워드 강조 (키워드 빨간색/굵게, 사유 초록색)"""
+    matcher = compile_keywords(keyword_notes)
+    count = 0
+    for paragraph in doc.paragraphs:
+        count += highlight_paragraph(paragraph, matcher)
+    return count
+
+
+def review_text_document(text, keyword_notes):
+    """OCR로 뽑은 텍스트로 검수 결과 문서 생성, (BytesIO, 강조한 키워드 수) 반환 (줄마다 단락 하나)"""
+    doc = Document()
+
+    style = doc.styles['Normal']
+    style.font.size = Pt(10)
+    style.font.name = FONT_NAME
+
+    # 키워드 검색기 (같은 키워드 세트는 한 번만 생성)
+    matcher = compile_keywords(keyword_notes)
+    keyword_notes = matcher.keyword_notes
+
+    lines = text.split('\n')
+    count = 0
+
+    for line in lines:
+        paragraph = doc.add_paragraph()
+        paragraph.paragraph_format.space_after = Pt(0)
+        paragraph.paragraph_format.space_before = Pt(0)
+        paragraph.paragraph_format.line_spacing = 1.0
+
+        # 키워드 위치 찾기 (한 번에 검색, 겹치면 가장 왼쪽/가장 긴 키워드)
+        current_pos = 0
+        for start, end, keyword in matcher.find_longest(line):
+            count += 1
+            if start > current_pos:
+                run = paragraph.add_run(line[current_pos:start])
+                run.font.name = FONT_NAME
+                run.font.size = Pt(10)
+
+            # 띄어쓰기 등이 다른 표현도 찾으므로 키워드 대신 원문 구간을 표시
+            run = paragraph.add_run(line[start:end])
+            run.font.name = FONT_NAME
+            run.font.size = Pt(10)
+            run.font.color.rgb = RGBColor(255, 0, 0)
+            run.bold = True
+
+            if keyword_notes[keyword]:
+                run = paragraph.add_run(f" ({keyword_notes[keyword]}) ")
+                run.font.name = FONT_NAME
+                run.font.size = Pt(10)
+                run.font.color.rgb = RGBColor(0, 128, 0)
+
+            current_pos = end
+
+        if current_pos < len(line):
+            run = paragraph.add_run(line[current_pos:])
+            run.font.name = FONT_NAME
+            run.font.size = Pt(10)
+
+    doc_io = io.BytesIO()
+    doc.save(doc_io)
+    doc_io.seek(0)
+    return doc_io, count
+
+
+def review_document(data, is_text, keyword_notes, timings=None, name=None):
+    """파일 내용(bytes)을 검수해서 (결과 bytes, 강조한 키워드 수) 반환
+
+    txt/docx 결과는 docx, hwpx 결과는 hwpx다 (txt는 줄마다 단락 하나).
+    timings(StageTimings)를 주면 txt 변환(검수 포함) 시간을 따로 기록한다 (name: 파일 이름).
+    """
+    output = io.BytesIO()
+    if is_text:
+        # 조금씩 디코딩하면서 줄마다 검색하고 결과 docx를 바로 씀 (변환→저장→다시 열기 없음)
+        from .text_stream import highlight_text_stream
+        with (timings.stage('convert_txt_to_docx', file=name, bytes_in=len(data))
+              if timings else nullcontext()) as stage:
+            count = highlight_text_stream(io.BytesIO(data), output, keyword_notes)
+            if stage is not None:
+                stage['hits'] = count
+        return output.getvalue(), count
+
+    from .hwpx import highlight_hwpx_stream, is_hwpx
+    if is_hwpx(data):
+        count = highlight_hwpx_stream(io.BytesIO(data), output, keyword_notes)
+        return output.getvalue(), count
+    from .docx_stream import highlight_docx_stream
+    if len(data) >= STREAM_THRESHOLD:
+        # 큰 문서는 문서 객체를 만들지 않고 XML을 스트리밍으로 처리
+        count = highlight_docx_stream(io.BytesIO(data), output, keyword_notes)
+        return output.getvalue(), count
+
+    doc = Document(io.BytesIO(data))
+    count = highlight_document(doc, keyword_notes)
+    doc.save(output)
+    return output.getvalue(), count
+
+
+def review_file(source_path, target_path, keyword_notes):
+    """원고 파일을 검수해서 결과 파일로 저장, 강조한 키워드 수 반환 (형식은 확장자로 판단)
+
+    내용을 한 번에 읽어 두지 않고 경로에서 바로 처리한다 (txt, hwpx, 큰 docx는 스트리밍).
+    결과 파일은 다 쓴 뒤에 교체하므로 중간에 실패해도 반쯤 쓴 파일이 남지 않는다.
+    """
+    ext = os.path.splitext(source_path)[1].lower()
+    if ext == '.txt':
+        from .text_stream import highlight_text_file
+        return highlight_text_file(source_path, target_path, keyword_notes)
+    if ext == '.hwpx':
+        from .hwpx import highlight_hwpx_file
+        return highlight_hwpx_file(source_path, target_path, keyword_notes)
+    if os.path.getsize(source_path) >= STREAM_THRESHOLD:
+        from .docx_stream import highlight_docx_file
+        return highlight_docx_file(source_path, target_path, keyword_notes)
+
+    doc = Document(source_path)
+    count = highlight_document(doc, keyword_notes)
+    tmp_path = f"{target_path}.part"
+    try:
+        doc.save(tmp_path)
+        os.replace(tmp_path, target_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+
+def review_bytes(data, is_text, keyword_notes):
+    """파일 내용(bytes)을 검수해서 결과(bytes) 반환 (txt/docx는 docx, hwpx는 hwpx)"""
+    return review_document(data, is_text, keyword_notes)[0]
+
+
+# 작업 프로세스마다 한 번만 받아 두는 검색기
+_worker_matcher = None
+
+
+def _init_worker(keywords):
+    """작업 프로세스 초기화 (스냅샷 경로면 mmap으로 열고, 사전이면 컴파일)"""
+    global _worker_matcher
+    if isinstance(keywords, str):
+        from .snapshot import MappedKeywordMatcher
+        _worker_matcher = MappedKeywordMatcher(keywords)
+    else:
+        _worker_matcher = compile_keywords(keywords)
+
+
+def _review_in_worker(data, is_text):
+    return review_bytes(data, is_text, _worker_matcher)
+
+
+def _review_file_in_worker(source_path, target_path):
+    return review_file(source_path, target_path, _worker_matcher)
+
+
+def _timed_review_in_worker(data, is_text):
+    """(결과 bytes, {'seconds': 작업 프로세스에서 걸린 시간, 'hits': 키워드 수})"""
+    start = time.perf_counter()
+    result, count = review_document(data, is_text, _worker_matcher)
+    return result, {'seconds': time.perf_counter() - start, 'hits': count}
+
+
+def _start_pool(keyword_notes, workers):
+    """검색기를 한 번만 넘겨 두는 작업 프로세스 풀 생성"""
+    matcher = compile_keywords(keyword_notes)
+    # 스냅샷이면 경로만 넘겨서 작업 프로세스들이 같은 파일을 공유하게 한다
+    payload = getattr(matcher, 'path', None) or matcher.keyword_notes
+    context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=_init_worker, initargs=(payload,))
+
+
+class ReviewPool:
+    """파일을 하나씩 넘겨 검수하는 프로세스 풀 (여러 스레드에서 동시에 호출 가능)"""
+
+    def __init__(self, keyword_notes, workers=DEFAULT_WORKERS):
+        self.workers = max(1, workers)
+        self._pool = _start_pool(keyword_notes, self.workers)
+
+    def review_file(self, source_path, target_path):
+        """작업 프로세스에서 review_file 실행, 강조한 키워드 수 반환
+
+        파일 내용 대신 경로만 넘기므로 큰 원고도 프로세스 사이에 복사하지 않는다.
+        """
+        return self._pool.submit(_review_file_in_worker, source_path, target_path).result()
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def review_files(files, keyword_notes, workers=DEFAULT_WORKERS, on_progress=None,
+                 with_stats=False):
+    """여러 파일을 프로세스 풀에서 검수
+
+    files는 (내용 bytes, txt 여부) 목록이다. 결과는 업로드 순서대로
+    (결과 bytes 또는 None, 오류 또는 None)를 하나씩 내보내며,
+    앞 파일이 끝나는 즉시 내보내므로 결과 전체를 메모리에 모아 두지 않는다.
+    on_progress(완료 개수, 전체 개수)는 파일이 끝날 때마다 호출된다.
+    중간에 그만 읽으면(close) 아직 시작하지 않은 파일은 검수하지 않는다.
+    with_stats면 (결과, 오류, {'seconds', 'hits'} 또는 None)을 내보낸다.
+    """
+    workers = max(1, min(workers, len(files)))
+    with _start_pool(keyword_notes, workers) as pool:
+        task = _timed_review_in_worker if with_stats else _review_in_worker
+        futures = {pool.submit(task, data, is_text): i
+                   for i, (data, is_text) in enumerate(files)}
+        finished = {}
+        next_index = 0
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures.pop(future)
+                try:
+                    if with_stats:
+                        result, stats = future.result()
+                        finished[i] = (result, None, stats)
+                    else:
+                        finished[i] = (future.result(), None)
+                except Exception as e:
+                    finished[i] = (None, e, None) if with_stats else (None, e)
+                if on_progress:
+                    on_progress(done, len(files))
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+        finally:
+            # 중간에 멈추면 아직 시작하지 않은 파일은 검수하지 않음
+            for future in futures:
+                future.cancel()
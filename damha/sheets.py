@@ -0,0 +1,113 @@
+"""구글 시트 연결과 '키워드'/'검수파일' 시트 일괄 읽기/쓰기 (행마다 API를 호출하지 않음)
+
+gspread/oauth2client는 무거우므로 authorize()를 처음 호출할 때 불러온다.
+"""
+from datetime import datetime
+
+SCOPE = ['https://spreadsheets.google.com/feeds',
+         'https://www.googleapis.com/auth/drive']
+
+# 서비스 계정 인증 정보 항목 (Streamlit secrets의 gcp_service_account)
+SERVICE_ACCOUNT_KEYS = ('type', 'project_id', 'private_key_id', 'private_key', 'client_email',
+                        'client_id', 'auth_uri', 'token_uri', 'auth_provider_x509_cert_url',
+                        'client_x509_cert_url')
+
+# 키워드 시트 구성 (B: 키워드, C: 사유, 3행부터)
+KEYWORD_RANGE = 'B3:C'
+
+# 검수파일 시트 구성 (F: 폴더, G: 파일 이름, H: 결과 파일 이름, I: 검수 일자, J: 키워드 수)
+FIRST_ROW = 4
+INPUT_COLUMNS = ('F', 'H')
+RESULT_COLUMNS = ('I', 'J')
+
+# 이만큼 결과가 쌓이면 중간에 한 번 기록
+DEFAULT_FLUSH_EVERY = 50
+
+
+def authorize(credentials=None, keyfile=None):
+    """서비스 계정으로 인증한 gspread 클라이언트 (credentials: 인증 정보 딕셔너리, keyfile: json 파일 경로)"""
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    if credentials is not None:
+        creds = ServiceAccountCredentials.from_json_keyfile_dict(
+            {key: credentials[key] for key in SERVICE_ACCOUNT_KEYS}, SCOPE)
+    else:
+        creds = ServiceAccountCredentials.from_json_keyfile_name(keyfile, SCOPE)
+    return gspread.authorize(creds)
+
+
+def read_keyword_notes(worksheet):
+    """'키워드' 시트의 키워드와 사유를 한 번에 읽어서 {키워드: 사유} 반환 (빈 키워드는 제외)"""
+    keyword_notes = {}
+    for cells in worksheet.get(KEYWORD_RANGE):
+        keyword = cells[0] if cells else ''
+        reason = cells[1] if len(cells) > 1 else ''
+        if keyword.strip():
+            keyword_notes[keyword] = reason if reason else ''
+    return keyword_notes
+
+
+class ReviewRow:
+    """검수할 파일 한 행"""
+
+    __slots__ = ('row', 'folder', 'name', 'output')
+
+    def __init__(self, row, folder, name, output):
+        self.row = row
+        self.folder = folder
+        self.name = name
+        self.output = output
+
+
+def read_review_rows(worksheet, first_row=FIRST_ROW):
+    """F~H열을 한 번에 읽어서 ReviewRow 목록 반환
+
+    범위 끝을 정하지 않고 읽으며, 폴더가 빈 행을 만나면 멈춘다.
+    파일 이름이 빈 행은 건너뛴다.
+    """
+    first, last = INPUT_COLUMNS
+    values = worksheet.get(f'{first}{first_row}:{last}')
+    rows = []
+    for offset, cells in enumerate(values):
+        cells = list(cells) + [''] * (3 - len(cells))
+        folder, name, output = cells[:3]
+        if not folder:
+            break
+        if not name:
+            continue
+        rows.append(ReviewRow(first_row + offset, folder, name, output))
+    return rows
+
+
+class ResultWriter:
+    """검수 결과(일자, 키워드 수)를 모았다가 batch_update 한 번으로 기록"""
+
+    def __init__(self, worksheet, flush_every=DEFAULT_FLUSH_EVERY):
+        self.worksheet = worksheet
+        self.flush_every = flush_every
+        self._pending = []
+
+    def record(self, row, hits, when=None):
+        """한 행의 결과 추가 (flush_every개가 쌓이면 기록)"""
+        when = when or datetime.now()
+        first, last = RESULT_COLUMNS
+        self._pending.append({
+            'range': f'{first}{row}:{last}{row}',
+            'values': [[when.strftime('%Y-%m-%d %H:%M:%S'), hits]]
+        })
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """쌓인 결과 기록"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        # 날짜가 시트에서 날짜 형식으로 보이도록 사용자 입력처럼 기록
+        self.worksheet.batch_update(pending, value_input_option='USER_ENTERED')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
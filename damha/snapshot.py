@@ -0,0 +1,314 @@
+"""컴파일된 키워드 검색기 스냅샷 (디스크 저장 / mmap 로드)
+
+스냅샷 파일 구조
+    MAGIC(8) + 헤더 길이(uint32) + JSON 헤더 + int32 배열들(8바이트 정렬)
+
+헤더에는 시트 데이터의 해시와 각 배열의 (위치, 길이)가 들어간다.
+trie는 정규화한 키워드(띄어쓰기 변형 포함 검색 패턴)로 만들고, 키워드 문자열은 원래
+형태로, 패턴별 키워드 번호는 따로 저장한다.
+trie는 상태별 간선을 글자 순으로 정렬한 CSR 형태로 저장하고,
+실패 링크와 출력 링크도 미리 계산해서 넣으므로 로드할 때 다시 만들 필요가 없다.
+다른 키워드의 앞부분인 키워드도 그대로 저장한다 (겹치는 위치는 검색할 때 find_longest가
+가장 긴 키워드를 고른다).
+
+마지막 스냅샷 포인터(latest)는 시트(source)마다 따로 두므로 같은 폴더를 쓰는 앱끼리
+서로의 키워드 세트로 시작하지 않는다.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from .matcher import KeywordMatcher, compile_keywords
+
+MAGIC = b'DAMHAKW3'
+
+# 스냅샷 저장 위치
+DEFAULT_DIR = os.environ.get(
+    'DAMHA_SNAPSHOT_DIR', os.path.join(tempfile.gettempdir(), 'damha'))
+
+_SECTIONS = ('keyword_bytes', 'keyword_offsets', 'note_bytes', 'note_offsets',
+             'lengths', 'pattern_keywords', 'state_offsets', 'edge_chars', 'edge_targets',
+             'fail', 'out', 'link')
+
+
+def normalize_keywords(keyword_notes):
+    """키워드 정리 (앞뒤 공백 제거, 중복 키워드는 처음 나온 사유 사용)"""
+    normalized = {}
+    for keyword, note in keyword_notes.items():
+        keyword = keyword.strip()
+        if not keyword:
+            continue
+        note = (note or '').strip()
+        if keyword not in normalized or not normalized[keyword]:
+            normalized[keyword] = note
+    return normalized
+
+
+def content_hash(keyword_notes):
+    """시트 데이터 해시 (스냅샷 파일 이름으로 사용)"""
+    data = json.dumps(list(keyword_notes.items()), ensure_ascii=False)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def _pack_strings(strings):
+    blob = bytearray()
+    offsets = array('i', [0])
+    for s in strings:
+        blob += s.encode('utf-8')
+        offsets.append(len(blob))
+    return bytes(blob), offsets
+
+
+def _unpack_strings(blob, offsets):
+    return [bytes(blob[offsets[i]:offsets[i + 1]]).decode('utf-8')
+            for i in range(len(offsets) - 1)]
+
+
+def write_snapshot(matcher, path, digest):
+    """검색기를 스냅샷 파일로 저장 (임시 파일에 쓴 뒤 교체)"""
+    state_offsets = array('i', [0])
+    edge_chars = array('i')
+    edge_targets = array('i')
+    for edges in matcher._goto:
+        for ch, target in sorted(edges.items()):
+            edge_chars.append(ord(ch))
+            edge_targets.append(target)
+        state_offsets.append(len(edge_chars))
+
+    keyword_bytes, keyword_offsets = _pack_strings(matcher.keywords)
+    note_bytes, note_offsets = _pack_strings(
+        matcher.keyword_notes[k] for k in matcher.keywords)
+
+    sections = {
+        'keyword_bytes': keyword_bytes,
+        'keyword_offsets': keyword_offsets,
+        'note_bytes': note_bytes,
+        'note_offsets': note_offsets,
+        'lengths': array('i', matcher.lengths),
+        'pattern_keywords': array('i', matcher.pattern_keywords),
+        'state_offsets': state_offsets,
+        'edge_chars': edge_chars,
+        'edge_targets': edge_targets,
+        'fail': array('i', matcher._fail),
+        'out': array('i', matcher._out),
+        'link': array('i', matcher._link),
+    }
+
+    # 배열 위치가 헤더 길이에 따라 달라지므로 길이가 바뀌지 않을 때까지 다시 계산
+    layout = {}
+    header = b''
+    while True:
+        pos = len(MAGIC) + 4 + len(header)
+        for name in _SECTIONS:
+            pos += -pos % 8
+            size = len(sections[name]) * (4 if isinstance(sections[name], array) else 1)
+            layout[name] = [pos, size]
+            pos += size
+        new_header = json.dumps({'hash': digest, 'max_length': matcher.max_length,
+                                 'normalize': matcher.normalize,
+                                 'sections': layout}).encode('utf-8')
+        new_header += b' ' * (-(len(MAGIC) + 4 + len(new_header)) % 8)
+        if len(new_header) == len(header):
+            header = new_header
+            break
+        header = new_header
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', len(header)) + header)
+            for name in _SECTIONS:
+                f.write(b'\0' * (layout[name][0] - f.tell()))
+                data = sections[name]
+                f.write(data.tobytes() if isinstance(data, array) else data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class MappedKeywordMatcher(KeywordMatcher):
+    """mmap으로 연 스냅샷 위에서 바로 동작하는 검색기
+
+    trie 배열은 파일 페이지를 그대로 쓰므로 여러 프로세스가 같은 메모리를 공유한다.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"스냅샷 파일 형식이 아닙니다: {path}")
+        (header_size,) = struct.unpack_from('<I', buf, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(bytes(buf[start:start + header_size]))
+
+        def section(name, fmt='i'):
+            pos, size = header['sections'][name]
+            view = buf[pos:pos + size]
+            return view.cast(fmt) if fmt else view
+
+        self.path = str(path)
+        self.content_hash = header['hash']
+        self.created_at = os.path.getmtime(path)
+        self.keywords = _unpack_strings(section('keyword_bytes', None),
+                                        section('keyword_offsets'))
+        notes = _unpack_strings(section('note_bytes', None), section('note_offsets'))
+        self.keyword_notes = dict(zip(self.keywords, notes))
+        self.normalize = header['normalize']
+        self.lengths = section('lengths')
+        self.pattern_keywords = section('pattern_keywords')
+        self.max_length = header['max_length']
+        self._init_exact()
+        self._offsets = section('state_offsets')
+        self._chars = section('edge_chars')
+        self._targets = section('edge_targets')
+        self._fail = section('fail')
+        self._out = section('out')
+        self._link = section('link')
+
+        # 루트 상태는 거의 모든 글자에서 지나가므로 딕셔너리로 펼쳐 둔다
+        end = self._offsets[1]
+        self._root = dict(zip(self._chars[:end], self._targets[:end]))
+
+    def _scan(self, text):
+        root, offsets, chars, targets = self._root, self._offsets, self._chars, self._targets
+        fail, out, link, lengths = self._fail, self._out, self._link, self.lengths
+        found = []
+        state = 0
+        for i, ch in enumerate(text, 1):
+            c = ord(ch)
+            while True:
+                if not state:
+                    state = root.get(c, 0)
+                    break
+                lo, hi = offsets[state], offsets[state + 1]
+                j = bisect_left(chars, c, lo, hi)
+                if j < hi and chars[j] == c:
+                    state = targets[j]
+                    break
+                state = fail[state]
+
+            s = state if out[state] != -1 else link[state]
+            while s != -1:
+                pid = out[s]
+                found.append((i - lengths[pid], i, pid))
+                s = link[s]
+        return found
+
+
+class SnapshotStore:
+    """시트 데이터 해시별 스냅샷 보관소 (source: 시트 URL 등 키워드를 가져오는 곳)"""
+
+    def __init__(self, directory=DEFAULT_DIR, keep=5, source=None):
+        self.directory = Path(directory)
+        self.keep = keep
+        self.source = source
+        self.last_error = None
+
+    def path_for(self, digest):
+        return self.directory / f"keywords-{digest[:16]}.dkw"
+
+    @property
+    def latest_path(self):
+        if self.source is None:
+            return self.directory / 'latest'
+        key = hashlib.sha256(self.source.encode('utf-8')).hexdigest()[:16]
+        return self.directory / f'latest-{key}'
+
+    def load(self, digest):
+        """해시에 맞는 스냅샷 로드 (없거나 깨졌으면 None)"""
+        path = self.path_for(digest)
+        if not path.exists():
+            return None
+        try:
+            matcher = MappedKeywordMatcher(path)
+        except (OSError, ValueError):
+            return None
+        return matcher if matcher.content_hash == digest else None
+
+    def load_latest(self):
+        """마지막으로 저장한 스냅샷 로드 (없으면 None)"""
+        try:
+            digest = self.latest_path.read_text().strip()
+        except OSError:
+            return None
+        return self.load(digest)
+
+    def save(self, keyword_notes, digest=None):
+        """키워드 정리 후 컴파일해서 저장하고 mmap으로 다시 열어 반환"""
+        digest = digest or content_hash(keyword_notes)
+        matcher = KeywordMatcher(normalize_keywords(keyword_notes))
+        write_snapshot(matcher, self.path_for(digest), digest)
+
+        tmp = self.latest_path.with_name(f'{self.latest_path.name}.{os.getpid()}.tmp')
+        tmp.write_text(digest)
+        os.replace(tmp, self.latest_path)
+        self._prune()
+        return self.load(digest)
+
+    def _latest_paths(self):
+        """모든 시트의 마지막 스냅샷 경로"""
+        paths = set()
+        for pointer in self.directory.glob('latest*'):
+            if pointer.suffix == '.tmp':
+                continue
+            try:
+                paths.add(self.path_for(pointer.read_text().strip()))
+            except OSError:
+                continue
+        return paths
+
+    def _prune(self):
+        """오래된 스냅샷 정리 (최근 keep개와 시트별 마지막 스냅샷만 유지)"""
+        snapshots = sorted(self.directory.glob('keywords-*.dkw'),
+                           key=lambda p: p.stat().st_mtime, reverse=True)
+        latest = self._latest_paths()
+        for path in snapshots[self.keep:]:
+            if path in latest:
+                continue
+            try:
+                # 이미 mmap으로 연 프로세스는 삭제 후에도 계속 사용할 수 있다
+                path.unlink()
+            except OSError:
+                pass
+
+    def loader(self, fetch):
+        """KeywordCache용 loader 생성
+
+        시트를 읽은 뒤 같은 해시의 스냅샷이 있으면 그대로 쓰고, 없으면 새로 만든다.
+        시트를 읽지 못하면 마지막 스냅샷을 사용한다.
+        """
+        def load():
+            try:
+                keyword_notes = fetch()
+            except Exception as e:
+                self.last_error = e
+                matcher = self.load_latest()
+                if matcher is None:
+                    raise
+                return matcher
+
+            self.last_error = None
+            digest = content_hash(keyword_notes)
+            matcher = self.load(digest)
+            if matcher is None:
+                try:
+                    matcher = self.save(keyword_notes, digest)
+                except OSError as e:
+                    # 저장할 수 없는 환경이면 메모리에서만 사용
+                    self.last_error = e
+                    matcher = None
+            return matcher or compile_keywords(normalize_keywords(keyword_notes))
+        return load
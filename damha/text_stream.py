@@ -0,0 +1,303 @@
+"""txt 검수 (한 번만 디코딩하고, 일정한 크기의 조각으로 나눠 검색하면서 바로 docx 작성)
+
+앞부분만 보고 인코딩을 정한 뒤 TextIOWrapper로 조금씩 디코딩해서 검색기에 넘기고,
+(뒷부분에서 디코딩 오류가 나면 ENCODINGS의 다음 후보로 처음부터 다시 쓴다)
+결과 docx의 본문 XML도 zip 항목에 바로 써 나가므로 파일 크기와 상관없이 메모리 사용량이
+일정하다. 원문 한 줄이 단락 하나가 되고, 키워드는 줄 안에서만 찾는다. 아주 긴 줄이
+조각 경계에 걸리면 앞 조각의 끝부분(가장 긴 키워드 길이만큼)을 다음 조각 앞에 붙여서
+다시 검색하므로 경계에 걸친 키워드도 놓치지 않는다.
+
+서식은 기본 스타일(Normal)에 한 번만 넣어 둔 빈 문서를 캐시해서 쓰고, 결과는 python-docx로
+줄마다 단락을 추가한 뒤 highlight_document로 강조한 docx와 같은 XML이다.
+"""
+import codecs
+import io
+import os
+import re
+import shutil
+import zipfile
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from .matcher import compile_keywords
+from .review import KEYWORD_COLOR, NOTE_COLOR, set_base_font
+
+DOCUMENT_PART = 'word/document.xml'
+
+# 인코딩을 정할 때 읽는 앞부분 크기 (ASCII뿐이면 SNIFF_LIMIT까지 더 읽어 봄)
+SNIFF_BYTES = 64 * 1024
+SNIFF_LIMIT = 1024 * 1024
+# 한 번에 디코딩해서 검색하는 글자 수
+CHUNK_CHARS = 1024 * 1024
+
+# BOM이 없으면 이 순서로 시도
+ENCODINGS = ('utf-8', 'cp949', 'euc-kr')
+_BOMS = ((codecs.BOM_UTF8, 'utf-8-sig'),
+         (codecs.BOM_UTF16_LE, 'utf-16'),
+         (codecs.BOM_UTF16_BE, 'utf-16'))
+
+# <w:t> 하나에 모아 두는 최대 글자 수 (줄바꿈 없는 파일에서도 메모리가 늘지 않도록)
+_MAX_PENDING = 64 * 1024
+# zip 항목에 한 번에 쓰는 크기
+_WRITE_SIZE = 256 * 1024
+
+# XML에 쓸 수 없는 제어 문자
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def sniff_encoding(prefix, final=False, encodings=ENCODINGS):
+    """파일 앞부분(bytes)으로 인코딩 결정 (BOM 우선, 없으면 encodings 순서), 모르면 None
+
+    final이 False면 prefix 끝에서 잘린 멀티바이트 글자는 오류로 보지 않는다.
+    """
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding
+    for encoding in encodings:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(prefix, final)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def open_text(stream, encodings=ENCODINGS):
+    """bytes 파일 객체를 인코딩을 정해서 텍스트 스트림으로 열기 (줄바꿈은 \\n으로 통일)
+
+    stream은 seek할 수 있어야 한다. 다 쓴 뒤 detach()하면 원래 스트림은 닫히지 않는다.
+    encodings는 BOM이 없을 때 시도할 후보이고, 맞는 후보가 없으면 ValueError.
+    """
+    start = stream.tell()
+    prefix = stream.read(SNIFF_BYTES)
+    final = len(prefix) < SNIFF_BYTES
+    # ASCII뿐이면 utf-8과 cp949를 구분할 수 없으므로 더 읽어 본다
+    while not final and prefix.isascii() and len(prefix) < SNIFF_LIMIT:
+        more = stream.read(SNIFF_BYTES)
+        prefix += more
+        final = len(more) < SNIFF_BYTES
+    encoding = sniff_encoding(prefix, final, encodings)
+    if encoding is None:
+        raise ValueError("파일을 읽을 수 없습니다.")
+    stream.seek(start)
+    return io.TextIOWrapper(stream, encoding=encoding, newline=None)
+
+
+def next_encodings(encoding):
+    """encoding으로 디코딩하다 실패했을 때 이어서 시도할 후보 (BOM으로 정한 인코딩은 없음)"""
+    if encoding not in ENCODINGS:
+        return ()
+    return ENCODINGS[ENCODINGS.index(encoding) + 1:]
+
+
+def _read_chunks(text_stream, chunk_chars):
+    """텍스트 스트림을 chunk_chars글자씩 읽기 (디코딩 오류는 그대로 올림)"""
+    while True:
+        chunk = text_stream.read(chunk_chars)
+        if not chunk:
+            return
+        yield chunk
+
+
+def scan_segments(chunks, matcher):
+    """문자열 조각들을 줄 단위로 검색, (텍스트, 그 안의 [(시작, 끝, 키워드)], 줄 끝인지) 반환
+
+    줄 끝인 텍스트까지 이어 붙이면 원문 한 줄(줄바꿈 제외)이 되고, 찾은 키워드는 그 줄을
+    한 번에 find_longest로 찾은 것과 같다. 줄이 조각 끝에서 끊기면 끝에서 가장 긴 키워드
+    길이만큼은 다음 조각과 이어서 다시 검색하므로 조각 경계에 걸친 키워드도 찾는다.
+    마지막 줄(줄바꿈 뒤의 나머지, 빈 줄일 수 있음)도 줄 끝으로 내보낸다.
+    """
+    carry = ''
+    for chunk in chunks:
+        lines = (carry + chunk).split('\n')
+        for line in lines[:-1]:
+            yield line, list(matcher.find_longest(line)), True
+        text = lines[-1]
+        # 이 위치 앞에서 시작하는 키워드는 text 안에서 끝까지 찾을 수 있다
+        boundary = matcher.scan_boundary(text)
+        keep = boundary
+        hits = []
+        for start, end, keyword in matcher.find_longest(text):
+            if start >= boundary:
+                break
+            hits.append((start, end, keyword))
+            keep = max(keep, end)
+        if keep:
+            yield text[:keep], hits, False
+        carry = text[keep:]
+    yield carry, list(matcher.find_longest(carry)), True
+
+
+class _BodyWriter:
+    """본문 XML을 python-docx와 같은 모양으로 조금씩 쓰기 (줄마다 단락 하나)"""
+
+    def __init__(self, output):
+        self.output = output
+        self.parts = []
+        self.size = 0
+        self.paragraphs = 0
+        self.in_paragraph = False
+        self.props = None
+        self.pending = []
+        self.pending_size = 0
+
+    def _write(self, xml):
+        self.parts.append(xml)
+        self.size += len(xml)
+        if self.size >= _WRITE_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            self.output.write(''.join(self.parts).encode('utf-8'))
+            self.parts = []
+            self.size = 0
+
+    def _flush_text(self):
+        text = ''.join(self.pending)
+        self.pending = []
+        self.pending_size = 0
+        if not text:
+            return
+        # 앞뒤 공백이 있으면 공백 유지 속성 (python-docx와 같은 조건)
+        if len(text.strip()) < len(text):
+            self._write(f'<w:t xml:space="preserve">{escape(text)}</w:t>')
+        else:
+            self._write(f'<w:t>{escape(text)}</w:t>')
+
+    def run(self, text, props='', new=False):
+        """글자 추가 (props가 앞 글자와 같고 new가 아니면 같은 run에 이어서 씀)
+
+        props는 rPr 안에 넣을 XML이다 (빈 문자열이면 기본 스타일 그대로).
+        """
+        if _INVALID_XML.search(text):
+            raise ValueError("문서에 쓸 수 없는 제어 문자가 있습니다.")
+        if not self.in_paragraph:
+            self._write('<w:p>')
+            self.in_paragraph = True
+        if new or props != self.props:
+            self.end_run()
+            self._write(f'<w:r><w:rPr>{props}</w:rPr>' if props else '<w:r>')
+            self.props = props
+        for i, part in enumerate(text.split('\t')):
+            if i:
+                self._flush_text()
+                self._write('<w:tab/>')
+            if part:
+                self.pending.append(part)
+                self.pending_size += len(part)
+                if self.pending_size >= _MAX_PENDING:
+                    self._flush_text()
+
+    def end_run(self):
+        self._flush_text()
+        if self.props is not None:
+            self._write('</w:r>')
+            self.props = None
+
+    def end_paragraph(self):
+        """단락 닫기 (글자가 없었으면 빈 단락)"""
+        self.end_run()
+        self._write('</w:p>' if self.in_paragraph else '<w:p/>')
+        self.in_paragraph = False
+        self.paragraphs += 1
+
+
+_KEYWORD_PROPS = f'<w:b/><w:color w:val="{KEYWORD_COLOR}"/>'
+_NOTE_PROPS = f'<w:color w:val="{NOTE_COLOR}"/>'
+
+
+@lru_cache(maxsize=1)
+def _template():
+    """기본 글꼴을 넣은 빈 docx의 (zip 내용, 본문 앞 XML, 본문 뒤 XML)"""
+    from docx import Document
+    doc = Document()
+    set_base_font(doc)
+    output = io.BytesIO()
+    doc.save(output)
+    data = output.getvalue()
+    document = zipfile.ZipFile(io.BytesIO(data)).read(DOCUMENT_PART)
+    split = document.index(b'<w:body>') + len(b'<w:body>')
+    return data, document[:split], document[split:]
+
+
+def _write_docx(text_stream, target, matcher, chunk_chars):
+    """디코딩한 텍스트로 docx를 target에 쓰기, (강조한 키워드 수, 내용이 없는지) 반환"""
+    notes = matcher.keyword_notes
+    template, head, tail = _template()
+    count = 0
+    empty = True
+    with zipfile.ZipFile(io.BytesIO(template)) as zin, \
+            zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            if info.filename != DOCUMENT_PART:
+                zout.writestr(info, zin.read(info))
+                continue
+            new = zipfile.ZipInfo(info.filename, info.date_time)
+            new.compress_type = zipfile.ZIP_DEFLATED
+            with zout.open(new, 'w') as output:
+                output.write(head)
+                body = _BodyWriter(output)
+                for text, hits, line_end in scan_segments(_read_chunks(text_stream, chunk_chars),
+                                                          matcher):
+                    empty = empty and not text
+                    pos = 0
+                    for start, end, keyword in hits:
+                        if start > pos:
+                            body.run(text[pos:start])
+                        body.run(text[start:end], _KEYWORD_PROPS, new=True)
+                        if notes[keyword]:
+                            body.run(f" {notes[keyword]}", _NOTE_PROPS)
+                        pos = end
+                        count += 1
+                    if pos < len(text):
+                        body.run(text[pos:])
+                    if line_end:
+                        body.end_paragraph()
+                body.flush()
+                output.write(tail)
+    return count, empty and body.paragraphs == 1
+
+
+def highlight_text_stream(source, target, keyword_notes, chunk_chars=CHUNK_CHARS):
+    """txt(source, bytes 파일 객체)를 검수해서 docx를 target에 쓰기, 강조한 키워드 수 반환
+
+    원문 한 줄을 단락 하나로 쓰고 키워드는 빨간색/굵게, 사유는 초록색으로 표시한다.
+    앞부분으로 정한 인코딩이 뒷부분에서 맞지 않으면 source와 target을 처음 위치로 되돌려서
+    ENCODINGS의 다음 후보로 다시 쓴다 (target도 seek/truncate할 수 있어야 한다).
+    """
+    matcher = compile_keywords(keyword_notes)
+    source_start = source.tell()
+    target_start = target.tell()
+    encodings = ENCODINGS
+    while True:
+        text_stream = open_text(source, encodings)
+        try:
+            count, empty = _write_docx(text_stream, target, matcher, chunk_chars)
+            break
+        except UnicodeDecodeError as e:
+            encodings = next_encodings(text_stream.encoding)
+            if not encodings:
+                raise ValueError(
+                    f"파일을 읽을 수 없습니다 ({text_stream.encoding}: {e.reason})") from e
+        finally:
+            text_stream.detach()
+        source.seek(source_start)
+        target.seek(target_start)
+        target.truncate()
+    if empty:
+        raise ValueError("파일을 읽을 수 없습니다.")
+    return count
+
+
+def highlight_text_file(source_path, target_path, keyword_notes):
+    """경로 버전 (대상 파일은 다 쓴 뒤에 교체)"""
+    tmp_path = f"{target_path}.part"
+    try:
+        with open(source_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            count = highlight_text_stream(src, dst, keyword_notes)
+        shutil.move(tmp_path, target_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
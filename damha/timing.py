@@ -0,0 +1,91 @@
+"""단계별 처리 시간 기록
+
+검수 한 번(실행 한 번) 동안 단계마다 걸린 시간, 입출력 바이트, 키워드 수를 모아서
+화면에 보여 줄 목록으로 보관하고, 단계가 끝날 때마다 JSON 한 줄로 로그를 남긴다.
+
+로그는 DAMHA_TIMING_LOG로 정한다 (기본 stderr, 'off'면 남기지 않음, 그 외에는 파일 경로).
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+LOG_TARGET = os.environ.get('DAMHA_TIMING_LOG', 'stderr')
+
+logger = logging.getLogger('damha.timing')
+
+
+def _configure_logger():
+    """JSON 로그 출력 설정 (한 번만, 메시지만 그대로 출력)"""
+    if logger.handlers or LOG_TARGET == 'off':
+        return
+    if LOG_TARGET == 'stderr':
+        handler = logging.StreamHandler()
+    else:
+        handler = logging.FileHandler(LOG_TARGET, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class StageTimings:
+    """실행 한 번의 단계별 기록 (app: 로그에 남길 앱 이름)"""
+
+    def __init__(self, app):
+        _configure_logger()
+        self.app = app
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, file=None, bytes_in=None):
+        """with 블록 하나를 단계로 기록 (블록 안에서 bytes_out, hits 등을 채울 수 있음)
+
+            with timings.stage('highlight_keywords', file=name, bytes_in=size) as stage:
+                ...
+                stage['hits'] = count
+        """
+        record = {'stage': name, 'file': file, 'bytes_in': bytes_in,
+                  'bytes_out': None, 'hits': None}
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record['error'] = str(e)
+            raise
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self._emit(record)
+
+    def add(self, name, seconds, file=None, bytes_in=None, bytes_out=None, hits=None, **extra):
+        """다른 곳(작업 프로세스 등)에서 잰 시간 기록"""
+        record = {'stage': name, 'file': file, 'bytes_in': bytes_in,
+                  'bytes_out': bytes_out, 'hits': hits, 'seconds': seconds}
+        record.update(extra)
+        self._emit(record)
+
+    def _emit(self, record):
+        self.records.append(record)
+        if logger.handlers:
+            line = {'event': 'damha.stage', 'app': self.app, 'run': self.run_id,
+                    'time': datetime.now().isoformat(timespec='milliseconds')}
+            line.update(record)
+            logger.info(json.dumps(line, ensure_ascii=False))
+
+    def summary(self):
+        """단계별 합계 목록 (단계, 횟수, 총 시간, 입출력 바이트, 키워드 수), 기록된 순서대로"""
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record['stage'], {
+                'stage': record['stage'], 'count': 0, 'seconds': 0.0,
+                'bytes_in': 0, 'bytes_out': 0, 'hits': 0
+            })
+            total['count'] += 1
+            total['seconds'] += record['seconds']
+            for key in ('bytes_in', 'bytes_out', 'hits'):
+                total[key] += record.get(key) or 0
+        return list(totals.values())
@@ -0,0 +1,61 @@
+"""테스트 공용 도구 (gspread Worksheet 대신 쓰는 메모리 시트)"""
+import re
+
+_A1 = re.compile(r'^([A-Z]+)(\d*)$')
+
+
+def _parse_cell(ref):
+    """'F4' -> (열 번호, 행 번호 또는 None), 0부터 시작"""
+    match = _A1.match(ref)
+    if not match:
+        raise ValueError(f"지원하지 않는 범위입니다: {ref}")
+    letters, digits = match.groups()
+    col = 0
+    for ch in letters:
+        col = col * 26 + ord(ch) - ord('A') + 1
+    return col - 1, (int(digits) - 1 if digits else None)
+
+
+class LocalWorksheet:
+    """gspread Worksheet 대신 쓰는 메모리 시트 (호출 기록 포함)
+
+    get()과 batch_update()만 지원하며, gspread처럼 행/열 끝의 빈 칸은 잘라서 반환한다.
+    """
+
+    def __init__(self, rows=None):
+        self.rows = [list(row) for row in rows or []]
+        self.calls = []
+
+    def _range(self, a1):
+        start, _, end = a1.partition(':')
+        col0, row0 = _parse_cell(start)
+        col1, row1 = _parse_cell(end or start)
+        return col0, row0, col1, row1
+
+    def get(self, a1):
+        self.calls.append(('get', a1))
+        col0, row0, col1, row1 = self._range(a1)
+        last = len(self.rows) - 1 if row1 is None else row1
+        values = []
+        for r in range(row0, last + 1):
+            row = self.rows[r] if r < len(self.rows) else []
+            cells = [str(v) for v in row[col0:col1 + 1]]
+            while cells and cells[-1] == '':
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def batch_update(self, data, **kwargs):
+        self.calls.append(('batch_update', len(data)))
+        for item in data:
+            col0, row0, _, _ = self._range(item['range'])
+            for r, row_values in enumerate(item['values'], row0):
+                while len(self.rows) <= r:
+                    self.rows.append([])
+                row = self.rows[r]
+                for c, value in enumerate(row_values, col0):
+                    while len(row) <= c:
+                        row.append('')
+                    row[c] = value
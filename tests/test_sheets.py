@@ -0,0 +1,90 @@
+"""damha.sheets 일괄 읽기/쓰기 (LocalWorksheet로 확인)"""
+from datetime import datetime
+
+from conftest import LocalWorksheet
+from damha.sheets import ResultWriter, read_review_rows
+
+
+def review_sheet(rows):
+    """검수파일 시트 모양 (1~3행은 머리글, F~H열에 폴더/파일 이름/결과 파일 이름)"""
+    sheet = [['제목'], [], ['', '', '', '', '', '폴더', '파일', '결과']]
+    for folder, name, output in rows:
+        sheet.append(['', '', '', '', '', folder, name, output])
+    return LocalWorksheet(sheet)
+
+
+def test_read_review_rows_reads_open_ended_range_once():
+    sheet = review_sheet([('C:\\a', 'f1', 'o1'), ('C:\\b', 'f2', 'o2')])
+
+    rows = read_review_rows(sheet)
+
+    assert sheet.calls == [('get', 'F4:H')]
+    assert [(r.row, r.folder, r.name, r.output) for r in rows] == [
+        (4, 'C:\\a', 'f1', 'o1'), (5, 'C:\\b', 'f2', 'o2')]
+
+
+def test_read_review_rows_pads_trimmed_trailing_cells():
+    # 결과 파일 이름이 빈 행은 시트에서 잘려서 두 칸만 온다
+    sheet = review_sheet([('C:\\a', 'f1', '')])
+    assert sheet.get('F4:H') == [['C:\\a', 'f1']]
+
+    rows = read_review_rows(sheet)
+
+    assert [(r.folder, r.name, r.output) for r in rows] == [('C:\\a', 'f1', '')]
+
+
+def test_read_review_rows_skips_rows_without_name():
+    sheet = review_sheet([('C:\\a', 'f1', 'o1'), ('C:\\a', '', 'o2'), ('C:\\a', 'f3', 'o3')])
+
+    rows = read_review_rows(sheet)
+
+    assert [(r.row, r.name) for r in rows] == [(4, 'f1'), (6, 'f3')]
+
+
+def test_read_review_rows_stops_at_first_row_without_folder():
+    sheet = review_sheet([('C:\\a', 'f1', 'o1'), ('', 'f2', 'o2'), ('C:\\a', 'f3', 'o3')])
+
+    rows = read_review_rows(sheet)
+
+    assert [r.name for r in rows] == ['f1']
+
+
+def test_read_review_rows_empty_sheet():
+    assert read_review_rows(review_sheet([])) == []
+
+
+def test_result_writer_flushes_every_n_records():
+    sheet = LocalWorksheet()
+    when = datetime(2024, 1, 2, 3, 4, 5)
+
+    writer = ResultWriter(sheet, flush_every=3)
+    for row in range(4, 11):
+        writer.record(row, row * 10, when)
+
+    # 7개 중 3개씩 두 번 기록, 1개는 아직 대기
+    assert sheet.calls == [('batch_update', 3), ('batch_update', 3)]
+    assert sheet.get('I4:J9') == [['2024-01-02 03:04:05', '40'], ['2024-01-02 03:04:05', '50'],
+                                  ['2024-01-02 03:04:05', '60'], ['2024-01-02 03:04:05', '70'],
+                                  ['2024-01-02 03:04:05', '80'], ['2024-01-02 03:04:05', '90']]
+    assert sheet.get('I10:J10') == []
+
+
+def test_result_writer_flushes_remainder_on_exit():
+    sheet = LocalWorksheet()
+    when = datetime(2024, 1, 2, 3, 4, 5)
+
+    with ResultWriter(sheet, flush_every=3) as writer:
+        for row in range(4, 8):
+            writer.record(row, 1, when)
+
+    assert sheet.calls == [('batch_update', 3), ('batch_update', 1)]
+    assert sheet.get('I7:J7') == [['2024-01-02 03:04:05', '1']]
+
+
+def test_result_writer_without_records_does_not_call_sheet():
+    sheet = LocalWorksheet()
+
+    with ResultWriter(sheet):
+        pass
+
+    assert sheet.calls == []
@@ -1,18 +1,16 @@
 import streamlit as st
-import time
-from docx import Document
-from docx.shared import RGBColor, Pt
-from docx.enum.text import WD_LINE_SPACING
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import os
-import requests
-import uuid
-import json
-import base64
-from PIL import Image
-from datetime import datetime
-import io
+import sys
+from pathlib import Path
+
+# 공용 모듈(damha) 경로 추가
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+# 첫 화면에는 가벼운 모듈만 불러오고, requests/PIL/numpy/docx/gspread 등은 처음 쓸 때 불러온다
+from damha.config import DEFAULT_BATCH_IMAGES, DEFAULT_CONCURRENCY
+from damha.keywords import shared_keyword_cache
+from damha.ocr_cache import OCRCache
+from damha.sheets import authorize, read_keyword_notes
+from damha.timing import StageTimings
 
 # 페이지 설정
 st.set_page_config(
@@ -35,188 +33,46 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-def clean_text(text):
-    """텍스트 정리"""
-    remove_chars = '☑◆●■□△▲▽▼→←↑↓★☆○◎◇◆□■△▲▽▼※~$'
-    for char in remove_chars:
-        text = text.replace(char, '')
-    return ' '.join(text.split()).strip()
+@st.cache_resource
+def get_ocr_cache():
+    """OCR 결과 캐시 (재실행, 다운로드 클릭, 같은 이미지 재업로드 시 API 호출 생략)"""
+    return OCRCache()
 
-def extract_text_with_clova(image_bytes):
-    """CLOVA OCR API를 사용한 텍스트 추출"""
-    api_url = st.secrets["clova_ocr"]["api_url"]
-    secret_key = st.secrets["clova_ocr"]["secret_key"]
+@st.cache_resource
+def get_ocr_client(concurrency, batch_images=DEFAULT_BATCH_IMAGES):
+    """CLOVA OCR 클라이언트 (연결을 재실행 사이에도 재사용)"""
+    from damha.ocr import ClovaOCR
+    return ClovaOCR(st.secrets["clova_ocr"]["api_url"],
+                    st.secrets["clova_ocr"]["secret_key"],
+                    concurrency=concurrency,
+                    cache=get_ocr_cache(),
+                    batch_images=batch_images)
 
-    try:
-        file_data_base64 = base64.b64encode(image_bytes).decode()
-        
-        request_json = {
-            'images': [
-                {
-                    'format': 'jpg',
-                    'name': 'demo',
-                    'data': file_data_base64
-                }
-            ],
-            'requestId': str(uuid.uuid4()),
-            'version': 'V2',
-            'timestamp': int(round(time.time() * 1000))
-        }
-            
-        headers = {
-            'X-OCR-SECRET': secret_key,
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.post(api_url, headers=headers, json=request_json)
-        
-        if response.status_code == 200:
-            result = response.json()
-            
-            current_line = []
-            lines = []
-            last_y = None
-            y_threshold = 10
-            
-            for image in result.get('images', []):
-                fields = sorted(image.get('fields', []), 
-                             key=lambda x: (x['boundingPoly']['vertices'][0]['y'], 
-                                         x['boundingPoly']['vertices'][0]['x']))
-                
-                for field in fields:
-                    if 'inferText' not in field:
-                        continue
-                        
-                    text = clean_text(field['inferText'])
-                    if not text:
-                        continue
-                        
-                    current_y = field['boundingPoly']['vertices'][0]['y']
-                    
-                    if last_y is not None and abs(current_y - last_y) > y_threshold:
-                        if current_line:
-                            cleaned_line = clean_text(' '.join(current_line))
-                            if cleaned_line:
-                                lines.append(cleaned_line)
-                            current_line = []
-                    
-                    current_line.append(text)
-                    last_y = current_y
-                
-                if current_line:
-                    cleaned_line = clean_text(' '.join(current_line))
-                    if cleaned_line:
-                        lines.append(cleaned_line)
-            
-            return '\n'.join(lines)
-            
-        else:
-            st.error(f"API 오류: {response.status_code}")
-            st.error(f"오류 메시지: {response.text}")
-            return None
-                
-    except Exception as e:
-        st.error(f"오류 발생: {str(e)}")
-        return None
+def fetch_keywords_from_sheet():
+    """구글 시트에서 키워드와 사유 가져오기 (실패 시 예외 발생)"""
+    client = authorize(st.secrets["gcp_service_account"])
+    sheet = client.open_by_url(st.secrets["spreadsheet"]["url"]).worksheet('키워드')
+    return read_keyword_notes(sheet)
+
+def get_keyword_cache():
+    """프로세스 전체에서 공유하는 키워드 캐시 (TTL이 지나면 새로고침)"""
+    # 디스크 스냅샷이 있으면 시트를 기다리지 않고 바로 사용
+    return shared_keyword_cache(fetch_keywords_from_sheet, source=st.secrets["spreadsheet"]["url"])
 
-@st.cache_resource
 def get_keywords_from_sheet():
-    """구글 시트에서 키워드와 사유 가져오기"""
+    """캐시된 키워드와 사유 가져오기"""
     try:
-        scope = ['https://spreadsheets.google.com/feeds',
-                'https://www.googleapis.com/auth/drive']
-        
-        credentials = {
-            "type": st.secrets["gcp_service_account"]["type"],
-            "project_id": st.secrets["gcp_service_account"]["project_id"],
-            "private_key_id": st.secrets["gcp_service_account"]["private_key_id"],
-            "private_key": st.secrets["gcp_service_account"]["private_key"],
-            "client_email": st.secrets["gcp_service_account"]["client_email"],
-            "client_id": st.secrets["gcp_service_account"]["client_id"],
-            "auth_uri": st.secrets["gcp_service_account"]["auth_uri"],
-            "token_uri": st.secrets["gcp_service_account"]["token_uri"],
-            "auth_provider_x509_cert_url": st.secrets["gcp_service_account"]["auth_provider_x509_cert_url"],
-            "client_x509_cert_url": st.secrets["gcp_service_account"]["client_x509_cert_url"]
-        }
-        
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(credentials, scope)
-        client = gspread.authorize(creds)
-        
-        sheet = client.open_by_url(st.secrets["spreadsheet"]["url"]).worksheet('키워드')
-        
-        keywords = sheet.col_values(2)[2:]
-        reasons = sheet.col_values(3)[2:]
-        
-        keyword_notes = {}
-        for keyword, reason in zip(keywords, reasons):
-            if keyword.strip():
-                keyword_notes[keyword] = reason if reason else ''
-                
-        return keyword_notes
-        
+        return get_keyword_cache().get().keyword_notes
     except Exception as e:
         st.error(f"구글 시트 데이터 가져오기 실패: {str(e)}")
         return None
 
-def create_review_document(text, keyword_notes):
-    """검수 결과 문서 생성"""
-    doc = Document()
-    
-    style = doc.styles['Normal']
-    style.font.size = Pt(10)
-    style.font.name = '맑은 고딕'
-    
-    lines = text.split('\n')
-    
-    for line in lines:
-        paragraph = doc.add_paragraph()
-        paragraph.paragraph_format.space_after = Pt(0)
-        paragraph.paragraph_format.space_before = Pt(0)
-        paragraph.paragraph_format.line_spacing = 1.0
-        
-        remaining_text = line
-        current_pos = 0
-        
-        while remaining_text:
-            earliest_keyword = None
-            earliest_pos = len(remaining_text)
-            
-            for keyword in keyword_notes:
-                pos = remaining_text.find(keyword)
-                if pos != -1 and pos < earliest_pos:
-                    earliest_keyword = keyword
-                    earliest_pos = pos
-            
-            if earliest_keyword:
-                if earliest_pos > 0:
-                    run = paragraph.add_run(remaining_text[:earliest_pos])
-                    run.font.name = "맑은 고딕"
-                    run.font.size = Pt(10)
-                
-                run = paragraph.add_run(earliest_keyword)
-                run.font.name = "맑은 고딕"
-                run.font.size = Pt(10)
-                run.font.color.rgb = RGBColor(255, 0, 0)
-                run.bold = True
-                
-                if keyword_notes[earliest_keyword]:
-                    run = paragraph.add_run(f" ({keyword_notes[earliest_keyword]}) ")
-                    run.font.name = "맑은 고딕"
-                    run.font.size = Pt(10)
-                    run.font.color.rgb = RGBColor(0, 128, 0)
-                
-                remaining_text = remaining_text[earliest_pos + len(earliest_keyword):]
-            else:
-                if remaining_text:
-                    run = paragraph.add_run(remaining_text)
-                    run.font.name = "맑은 고딕"
-                    run.font.size = Pt(10)
-                break
-    
-    doc_io = io.BytesIO()
-    doc.save(doc_io)
-    doc_io.seek(0)
-    return doc_io
+def show_timings(timings):
+    """단계별 처리 시간 표시 (사이드바에서 켠 경우에만)"""
+    with st.expander("단계별 처리 시간"):
+        st.caption(f"실행 ID {timings.run_id} (로그에서 같은 ID로 찾을 수 있습니다)")
+        st.dataframe(timings.summary())
+        st.dataframe(timings.records)
 
 def main():
     st.title('🔍 이미지 텍스트 추출 및 검수 시스템')
@@ -229,28 +85,65 @@ def main():
         accept_multiple_files=True
     )
 
+    # 단계별 처리 시간 기록 (화면 표시는 사이드바에서 선택)
+    timings = StageTimings('img')
+    show_timing_panel = st.sidebar.checkbox("단계별 처리 시간 보기")
+
     if uploaded_files:
-        keyword_notes = get_keywords_from_sheet()
+        with timings.stage('get_keywords_from_sheet') as stage:
+            keyword_notes = get_keywords_from_sheet()
+            stage['hits'] = len(keyword_notes) if keyword_notes else 0
         if not keyword_notes:
             st.error("키워드 데이터를 가져올 수 없습니다.")
             st.info("구글 시트 연결을 확인해주세요.")
             return
+        st.caption(get_keyword_cache().current.describe())
+
+        # 동시에 보낼 OCR 요청 수
+        concurrency = st.sidebar.number_input("동시 OCR 요청 수",
+                                              min_value=1,
+                                              max_value=16,
+                                              value=DEFAULT_CONCURRENCY)
+        # 작은 이미지 여러 장을 요청 하나로 묶어서 보낼 최대 장수 (1이면 묶지 않음)
+        batch_images = st.sidebar.number_input("요청당 이미지 수",
+                                               min_value=1,
+                                               max_value=10,
+                                               value=DEFAULT_BATCH_IMAGES)
 
         # 진행 상태 표시
         progress_text = "전체 진행 상황"
         progress_bar = st.progress(0)
         total_files = len(uploaded_files)
 
+        # 모든 이미지를 동시에 OCR (결과는 업로드 순서대로 도착하는 대로 표시)
+        ocr = get_ocr_client(concurrency, batch_images)
+        results = ocr.extract_many([f.getvalue() for f in uploaded_files])
+
         for idx, uploaded_file in enumerate(uploaded_files):
             st.subheader(f"파일 처리 중: {uploaded_file.name}")
             
             # OCR 처리
             with st.spinner('텍스트 추출 중...'):
-                image_bytes = uploaded_file.getvalue()
-                extracted_text = extract_text_with_clova(image_bytes)
+                # 요청은 동시에 진행되므로 이 파일 결과를 기다린 시간을 기록
+                with timings.stage('extract_text_with_clova', file=uploaded_file.name,
+                                   bytes_in=uploaded_file.size) as stage:
+                    ocr_result, error = next(results)
+                    if ocr_result:
+                        stage['bytes_out'] = len(ocr_result.text.encode('utf-8'))
+                        stage['sent_bytes'] = ocr_result.sent_bytes
+                        stage['cached'] = ocr_result.cached
+                if error:
+                    st.error(f"오류 발생: {str(error)}")
+                extracted_text = ocr_result.text if ocr_result else None
                 
                 if extracted_text:
                     st.success("텍스트 추출 완료")
+                    if ocr_result.cached:
+                        st.caption("이전 OCR 결과 사용 (API 호출 없음)")
+                    elif ocr_result.saved_bytes > 0:
+                        st.caption(f"전처리로 전송량 {ocr_result.saved_bytes / 1024:,.0f}KB 절약 "
+                                   f"({ocr_result.original_bytes / 1024:,.0f}KB → "
+                                   f"{ocr_result.sent_bytes / 1024:,.0f}KB)")
                     
                     # 추출된 텍스트 표시
                     with st.expander("추출된 텍스트 보기"):
@@ -258,7 +151,12 @@ def main():
                     
                     # 검수 결과 문서 생성
                     with st.spinner('검수 결과 생성 중...'):
-                        doc_io = create_review_document(extracted_text, keyword_notes)
+                        from damha.review import review_text_document
+                        with timings.stage('create_review_document', file=uploaded_file.name,
+                                           bytes_in=len(extracted_text.encode('utf-8'))) as stage:
+                            doc_io, stage['hits'] = review_text_document(extracted_text,
+                                                                         keyword_notes)
+                            stage['bytes_out'] = len(doc_io.getvalue())
                         
                         col1, col2 = st.columns(2)
                         with col1:
@@ -278,6 +176,9 @@ def main():
 
         st.success(f"모든 파일 처리 완료! (총 {total_files}개)")
 
+        if show_timing_panel:
+            show_timings(timings)
+
     # 사용 방법
     with st.expander("사용 방법"):
         st.markdown("""
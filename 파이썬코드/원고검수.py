@@ -1,21 +1,38 @@
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# 공용 모듈(damha) 경로 추가
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
 try:
     from docx import Document
-    from docx.shared import RGBColor
     import gspread
     from oauth2client.service_account import ServiceAccountCredentials
-    import os
-    from pathlib import Path
-    from datetime import datetime
-    import win32com.client as win32
-    import winreg
+    from damha.review import ReviewPool, highlight_document
+    from damha.docx_stream import STREAM_THRESHOLD, highlight_docx_file
+    from damha.hwpx import highlight_hwpx_file
+    from damha.text_stream import highlight_text_file
+    from damha.sheets import ResultWriter, read_keyword_notes, read_review_rows
+    from damha.manifest import DEFAULT_PATH as MANIFEST_PATH, ReviewManifest, hash_file, keyword_hash
 except ImportError as e:
     print(f"필요한 라이브러리를 설치해주세요: {e}")
     print("pip install lxml==4.9.3")
     print("pip install python-docx")
     print("pip install gspread oauth2client")
-    print("pip install pywin32")
     exit(1)
 
+# 한글 COM 자동화는 Windows에서만 사용 (hwpx는 없어도 처리 가능)
+try:
+    import win32com.client as win32
+    import winreg
+except ImportError:
+    win32 = None
+    winreg = None
+
 def setup_hwp_security():
     """한글 보안 모듈 설정"""
     try:
@@ -73,158 +90,68 @@ def highlight_keywords_hwp(hwp_path, keyword_notes, output_path):
         if 'hwp' in locals():
             hwp.Quit()
 
-def convert_txt_to_docx(txt_path):
-    """txt 파일을 docx로 변환"""
-    try:
-        # txt 파일 읽기 (여러 인코딩 시도)
-        text = None
-        for encoding in ['utf-8', 'cp949', 'euc-kr']:
-            try:
-                with open(txt_path, 'r', encoding=encoding) as f:
-                    text = f.read()
-                break
-            except UnicodeDecodeError:
-                continue
+def highlight_keywords(doc_path, keyword_notes, output_path):
+    """파일 형식에 따라 적절한 처리 함수 호출 (강조한 키워드 수 반환, 실패 시 예외 발생)"""
+    # 파일 존재 확인
+    if not os.path.exists(doc_path):
+        raise FileNotFoundError(f"파일을 찾을 수 없습니다 - {doc_path}")
         
-        if text is None:
-            print(f"파일 인코딩을 확인할 수 없습니다: {txt_path}")
-            return None
-            
-        # docx 파일 생성
-        doc = Document()
-        doc.add_paragraph(text)
+    # 파일 확장자 확인
+    file_ext = os.path.splitext(doc_path)[1].lower()
+    
+    if file_ext == '.hwp':
+        raise ValueError(f"한글 파일은 처리하지 않습니다 (hwpx로 저장하면 처리 가능): {doc_path}")
+    elif file_ext == '.hwpx':
+        # 한글 프로그램 없이 XML에서 바로 처리
+        count = highlight_hwpx_file(doc_path, output_path, keyword_notes)
+        print("한글 문서 처리가 완료되었습니다.")
+        return count
+    elif file_ext == '.docx':
+        if os.path.getsize(doc_path) >= STREAM_THRESHOLD:
+            # 큰 문서는 문서 객체를 만들지 않고 XML을 스트리밍으로 처리
+            count = highlight_docx_file(doc_path, output_path, keyword_notes)
+            print("Word 문서 처리가 완료되었습니다.")
+            return count
         
-        # 임시 docx 파일 경로
-        docx_path = txt_path.replace('.txt', '_temp.docx')
-        doc.save(docx_path)
+        # docx 파일 처리
+        doc = Document(doc_path)
         
-        return docx_path
+        # 키워드가 걸린 run만 나눠서 강조 (나머지 run과 서식은 그대로 유지)
+        count = highlight_document(doc, keyword_notes)
         
-    except Exception as e:
-        print(f"변환 중 오류 발생: {str(e)}")
-        return None
+        # 수정된 문서 저장
+        doc.save(output_path)
+        print("Word 문서 처리가 완료되었습니다.")
+        return count
+    elif file_ext == '.txt':
+        # 조금씩 디코딩하면서 검색하고 결과 docx를 바로 씀 (임시 docx 없음)
+        docx_output = os.path.splitext(output_path)[0] + '.docx'
+        count = highlight_text_file(doc_path, docx_output, keyword_notes)
+        print("txt 파일 처리가 완료되었습니다.")
+        return count
+    raise ValueError(f"지원하지 않는 파일 형식입니다: {file_ext}")
 
-def highlight_keywords(doc_path, keyword_notes, output_path):
-    """파일 형식에 따라 적절한 처리 함수 호출"""
-    try:
-        # 파일 존재 확인
-        if not os.path.exists(doc_path):
-            print(f"Error: 파일을 찾을 수 없습니다 - {doc_path}")
-            return
-            
-        # 파일 확장자 확인
-        file_ext = os.path.splitext(doc_path)[1].lower()
-        
-        if file_ext == '.hwp':
-            print(f"한글 파일은 처리하지 않습니다: {doc_path}")
-            return
-        elif file_ext == '.docx':
-            # docx 파일 처리
-            doc = Document(doc_path)
-            
-            # 모든 단락을 순회
-            for paragraph in doc.paragraphs:
-                # 단락의 텍스트 저장
-                text = paragraph.text
-                
-                # 키워드 위치 찾기
-                positions = []
-                for keyword in keyword_notes.keys():
-                    start = 0
-                    while True:
-                        index = text.find(keyword, start)
-                        if index == -1:
-                            break
-                        positions.append((index, index + len(keyword), keyword))
-                        start = index + 1
-                
-                if positions:
-                    # 위치를 정렬
-                    positions.sort()
-                    
-                    # 기존 runs 제거
-                    for run in paragraph.runs:
-                        run._element.getparent().remove(run._element)
-                    
-                    # 새로운 runs 추가
-                    current_pos = 0
-                    for start, end, keyword in positions:
-                        # 키워드 전 텍스트
-                        if start > current_pos:
-                            run = paragraph.add_run(text[current_pos:start])
-                        
-                        # 키워드 (빨간색으로, 굵게)
-                        run = paragraph.add_run(keyword)
-                        run.font.color.rgb = RGBColor(251, 65, 65)
-                        run.bold = True  # 굵게 표시
-                        
-                        # 키워드 옆에 노트 추가
-                        if keyword_notes[keyword]:  # 노트가 있는 경우에만
-                            note_run = paragraph.add_run(f" {keyword_notes[keyword]}")
-                            note_run.font.color.rgb = RGBColor(92, 179, 56)
-                        
-                        current_pos = end
-                    
-                    # 마지��� 키워드 이후 텍스트
-                    if current_pos < len(text):
-                        run = paragraph.add_run(text[current_pos:])
-            
-            # 수정된 문서 저장
-            doc.save(output_path)
-            print("Word 문서 처리가 완료되었습니다.")
-        elif file_ext == '.txt':
-            print("txt 파일을 docx로 변환 중...")
-            docx_path = convert_txt_to_docx(doc_path)
-            
-            if docx_path:
-                # 변환된 docx 파일 처리
-                docx_output = output_path.replace('.txt', '.docx')
-                result = highlight_keywords(docx_path, keyword_notes, docx_output)
-                
-                # 임시 파일 삭제
-                try:
-                    os.remove(docx_path)
-                except:
-                    pass
-                    
-                return result
-            else:
-                print("txt 파일 변환 실패")
-                return False
-        else:
-            print(f"지원하지 않는 파일 형식입니다: {file_ext}")
-            
-    except Exception as e:
-        print(f"오류 발생: {str(e)}")
+def open_spreadsheet():
+    """구글 시트 인증 후 스프레드시트 열기 (키워드/검수파일 시트가 같은 문서에 있음)"""
+    scope = ['https://spreadsheets.google.com/feeds',
+            'https://www.googleapis.com/auth/drive']
+    creds = ServiceAccountCredentials.from_json_keyfile_name(
+        'D:/이채윤 파일/코딩/colab-408723-89110ae33a5b.json', 
+        scope
+    )
+    client = gspread.authorize(creds)
+    return client.open_by_url(
+        'https://docs.google.com/spreadsheets/d/1eNCbstSMyQAA7CPvwb2qE7kZWg40B7Jf-fJ7ti0ABOE/edit'
+    )
 
-def get_keywords_from_sheet():
+def get_keywords_from_sheet(spreadsheet=None):
     """구글 시트에서 키워드와 사유를 가져오는 함수"""
     try:
-        # 구글 시트 인증
-        scope = ['https://spreadsheets.google.com/feeds',
-                'https://www.googleapis.com/auth/drive']
-        creds = ServiceAccountCredentials.from_json_keyfile_name(
-            'D:/이채윤 파일/코딩/colab-408723-89110ae33a5b.json', 
-            scope
-        )
-        client = gspread.authorize(creds)
-        
-        # 시트 열기
-        sheet = client.open_by_url(
-            'https://docs.google.com/spreadsheets/d/1eNCbstSMyQAA7CPvwb2qE7kZWg40B7Jf-fJ7ti0ABOE/edit?gid=0'
-        ).worksheet('키워드')
-        
-        # 키워드와 사유/제안 가져오기
-        keywords = sheet.col_values(2)[2:]  # B3부터
-        reasons = sheet.col_values(3)[2:]   # C3부터
-        
-        # 딕셔너리로 변환
-        keyword_notes = {}
-        for keyword, reason in zip(keywords, reasons):
-            if keyword.strip():  # 빈 셀 제외
-                keyword_notes[keyword] = reason if reason else ''
-                
-        return keyword_notes
+        # 시트 열기 (이미 연 스프레드시트가 있으면 재사용)
+        if spreadsheet is None:
+            spreadsheet = open_spreadsheet()
+        # 키워드와 사유/제안 한 번에 가져오기 (B3부터)
+        return read_keyword_notes(spreadsheet.worksheet('키워드'))
         
     except Exception as e:
         print(f"구글 시트 데이터 가져오기 실패: {str(e)}")
@@ -233,7 +160,7 @@ def get_keywords_from_sheet():
 def find_file_with_extension(base_path):
     """파일 확장자 자동 찾기"""
     # 지원하는 확장자 목록 (.hwp 제외)
-    extensions = ['.docx', '.txt']
+    extensions = ['.docx', '.hwpx', '.txt']
     
     # 확장자가 없는 경로에 각 확장자를 붙여서 시도
     for ext in extensions:
@@ -244,56 +171,183 @@ def find_file_with_extension(base_path):
     # 파일을 찾지 못한 경우
     return None, None
 
+def output_path_for(row, ext):
+    """결과 파일 경로 (txt는 docx로 변환해서 저장)"""
+    return f"{row.folder}\\{row.output}{'.docx' if ext == '.txt' else ext}"
+
+def review_row(row, keyword_notes, pool, manifest=None, keywords=None, force=False):
+    """검수파일 시트 한 행 처리 (파일 찾기 → 검수 → 저장)
+
+    (키워드 수, 건너뛰었는지) 반환. manifest가 있으면 원고와 키워드 세트가
+    지난번과 같은 행은 다시 검수하지 않는다 (force면 확인 없이 검수하고 기록만 남김).
+    """
+    base_path = f"{row.folder}\\{row.name}"
+    input_file, ext = find_file_with_extension(base_path)
+    if not input_file:
+        raise FileNotFoundError(f"파일을 찾을 수 없음: {base_path}")
+    output_file = output_path_for(row, ext)
+    
+    # 크기/수정 시각이 그대로면 파일을 읽지도 않고 건너뜀
+    if manifest is not None and not force:
+        count = manifest.check(input_file, output_file, keywords)
+        if count is not None:
+            return count, True
+    
+    # 수정 시각만 바뀌고 내용은 같으면 건너뜀 (파일 전체를 읽지 않고 조금씩 해시해서 기록에도 사용)
+    digest = hash_file(input_file) if manifest is not None else None
+    if manifest is not None and not force:
+        count = manifest.check(input_file, output_file, keywords, digest)
+        if count is not None:
+            return count, True
+    
+    # 검수는 작업 프로세스에서 경로로 바로 (이 스레드는 그동안 대기)
+    # 결과는 .part 파일에 다 쓴 뒤에 교체되므로 반쯤 쓴 파일이 남지 않는다
+    count = pool.review_file(input_file, output_file)
+    
+    if manifest is not None:
+        manifest.record(input_file, output_file, keywords, digest, count)
+    return count, False
+
+def review_row_serial(row, keyword_notes, manifest=None, keywords=None, force=False):
+    """한 행씩 처리하는 기존 방식 (결과는 review_row와 같은 형태)"""
+    base_path = f"{row.folder}\\{row.name}"
+    input_file, ext = find_file_with_extension(base_path)
+    if not (input_file and os.path.exists(input_file)):
+        raise FileNotFoundError(f"파일을 찾을 수 없음: {base_path} (지원하는 확장자: .txt, .docx, .hwpx)")
+    
+    if manifest is not None:
+        count = None if force else manifest.check(input_file, output_path_for(row, ext), keywords)
+        if count is not None:
+            return count, True
+        # 파일 전체를 읽지 않고 조금씩 해시 (내용은 highlight_keywords가 읽음)
+        digest = hash_file(input_file)
+        if not force:
+            count = manifest.check(input_file, output_path_for(row, ext), keywords, digest)
+            if count is not None:
+                return count, True
+    
+    # 출력 파일에도 같은 확장자 사용
+    output_file = f"{row.folder}\\{row.output}{ext}"
+    
+    print(f"\n처리 중: {row.name}{ext}")
+    # 실패하면 예외가 그대로 올라가서 행별 요약에 원인이 한 번만 표시된다
+    count = highlight_keywords(input_file, keyword_notes, output_file)
+    
+    if manifest is not None:
+        manifest.record(input_file, output_path_for(row, ext), keywords, digest, count)
+    return count, False
+
+def review_rows_parallel(rows, keyword_notes, jobs, read_ahead, manifest=None, keywords=None,
+                         force=False):
+    """여러 행을 동시에 처리해서 시트 순서대로 (행, 키워드 수, 건너뛰었는지, 오류) 반환
+
+    jobs개 프로세스가 검수하는 동안 read_ahead개 행의 파일을 미리 찾고 재검수 기록을 확인해 둔다.
+    원고 내용은 작업 프로세스가 경로에서 바로 읽으므로 이 프로세스에 모아 두지 않는다.
+    동시에 진행 중인 행은 jobs + read_ahead개로 제한한다.
+    """
+    window = jobs + read_ahead
+    with ReviewPool(keyword_notes, jobs) as pool, \
+            ThreadPoolExecutor(max_workers=window) as io_pool:
+        pending = deque()
+        
+        def collect():
+            row, future = pending.popleft()
+            try:
+                count, skipped = future.result()
+                return row, count, skipped, None
+            except Exception as e:
+                return row, None, False, e
+        
+        for row in rows:
+            pending.append((row, io_pool.submit(review_row, row, keyword_notes, pool,
+                                                manifest, keywords, force)))
+            if len(pending) >= window:
+                yield collect()
+        while pending:
+            yield collect()
+
+def review_rows_serial(rows, keyword_notes, manifest=None, keywords=None, force=False):
+    """한 행씩 처리해서 (행, 키워드 수, 건너뛰었는지, 오류) 반환"""
+    for row in rows:
+        try:
+            count, skipped = review_row_serial(row, keyword_notes, manifest, keywords, force)
+            yield row, count, skipped, None
+        except Exception as e:
+            yield row, None, False, e
+
+def print_summary(results):
+    """행별 처리 결과 요약 출력"""
+    failed = sum(1 for result in results if result[3] is not None)
+    skipped = sum(1 for result in results if result[2])
+    done = len(results) - failed - skipped
+    print(f"\n처리 결과: 검수 {done}개, 변경 없음 {skipped}개, 실패 {failed}개")
+    for row, count, was_skipped, error in results:
+        if error is not None:
+            print(f"  {row.row}행 {row.name}: 실패 - {error}")
+        elif was_skipped:
+            print(f"  {row.row}행 {row.name}: 변경 없음 (키워드 {count}개)")
+        else:
+            print(f"  {row.row}행 {row.name}: 성공 (키워드 {count}개)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="검수파일 시트의 원고를 검수합니다.")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="동시에 검수할 프로세스 수 (기본 1: 한 파일씩 처리)")
+    parser.add_argument('--read-ahead', type=int, default=None,
+                        help="검수하는 동안 미리 찾아 둘 파일 수 (기본: --jobs와 같음)")
+    parser.add_argument('--manifest', default=MANIFEST_PATH,
+                        help="재검수 기록(SQLite) 파일 경로")
+    parser.add_argument('--force', action='store_true',
+                        help="원고와 키워드가 그대로여도 모두 다시 검수")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
     try:
+        # 구글 시트 연결 (한 번만 인증)
+        spreadsheet = open_spreadsheet()
+        
         # 구글 시트에서 키워드와 사유 가져오기
-        keyword_notes = get_keywords_from_sheet()
+        keyword_notes = get_keywords_from_sheet(spreadsheet)
         if not keyword_notes:
             print("키워드를 가져오지 못했습니다.")
             exit(1)
-            
-        # 구글 시트 연결
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds = ServiceAccountCredentials.from_json_keyfile_name(
-            'D:/이채윤 파일/코딩/colab-408723-89110ae33a5b.json', 
-            scope
-        )
-        client = gspread.authorize(creds)
         
         # 검수파일 시트 열기
-        sheet = client.open_by_url(
-            'https://docs.google.com/spreadsheets/d/1eNCbstSMyQAA7CPvwb2qE7kZWg40B7Jf-fJ7ti0ABOE/edit?gid=226778372'
-        ).worksheet('검수파일')
+        sheet = spreadsheet.worksheet('검수파일')
         
-        # 파일 정보 가져오기
-        file_paths = sheet.range('F4:F100')  # 충분히 큰 범위 지정
-        file_names = sheet.range('G4:G100')
-        output_paths = sheet.range('H4:H100')
+        # 파일 정보 한 번에 가져오기 (F4부터 빈 행까지)
+        rows = read_review_rows(sheet)
+        results = []
         
-        # 각 파일 처리
-        for i, (path_cell, name_cell, output_cell) in enumerate(zip(file_paths, file_names, output_paths)):
-            if path_cell.value and name_cell.value:  # 값이 있는 행만 처리
-                base_path = f"{path_cell.value}\{name_cell.value}"
-                input_file, ext = find_file_with_extension(base_path)
-                
-                if input_file and os.path.exists(input_file):
-                    # 출력 파일에도 같은 확장자 사용
-                    output_file = f"{path_cell.value}\{output_cell.value}{ext}"
-                    
-                    print(f"\n처리 중: {name_cell.value}{ext}")
-                    highlight_keywords(input_file, keyword_notes, output_file)
-                    
-                    # 업데이트 일자 기록
-                    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    sheet.update_cell(i + 4, 9, now)  # I열��� 업데이트 일자 기록
-                    print(f"완료: {name_cell.value}{ext}")
+        # 재검수 기록 (--force면 확인하지 않고 모두 검수, 기록은 새로 남김)
+        manifest = ReviewManifest(args.manifest)
+        keywords = keyword_hash(keyword_notes)
+        
+        # 각 파일 처리 (검수 일자/키워드 수는 모아서 한 번에 기록)
+        with manifest, ResultWriter(sheet) as writer:
+            if args.jobs > 1:
+                read_ahead = args.read_ahead if args.read_ahead is not None else args.jobs
+                print(f"{len(rows)}개 행을 {args.jobs}개 프로세스로 처리합니다.")
+                processed = review_rows_parallel(rows, keyword_notes, args.jobs, read_ahead,
+                                                 manifest, keywords, args.force)
+            else:
+                processed = review_rows_serial(rows, keyword_notes, manifest, keywords, args.force)
+            
+            for row, count, skipped, error in processed:
+                results.append((row, count, skipped, error))
+                if error is not None:
+                    # 원인은 마지막 요약에 표시
+                    print(f"실패: {row.name}")
+                elif skipped:
+                    print(f"변경 없음: {row.name}")
                 else:
-                    print(f"\n파일을 찾을 수 없음: {base_path}")
-                    print("지원하는 확장자: .txt, .docx")
-            elif not path_cell.value:  # 빈 행을 만나면 종료
-                break
-                
+                    # I열에 업데이트 일자, J열에 키워드 수 기록
+                    writer.record(row.row, count)
+                    print(f"완료: {row.name} (키워드 {count}개)")
+        
+        print_summary(results)
         print("\n모든 파일 처리 완료")
         
     except Exception as e:
-        print(f"오류 발생: {str(e)}")
\ No newline at end of file
+        print(f"오류 발생: {str(e)}")
@@ -1,12 +1,15 @@
 import streamlit as st
 from docx import Document
-from docx.shared import RGBColor
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
-import os
 from pathlib import Path
 from datetime import datetime
-import tempfile
+import io
+import sys
+
+# 공용 모듈(damha) 경로 추가
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from damha.review import highlight_document, review_document
 
 def get_keywords_from_sheet():
     """구글 시트에서 키워드와 사유를 가져오는 함수"""
@@ -41,125 +44,27 @@ def get_keywords_from_sheet():
         st.error(f"구글 시트 데이터 가져오기 실패: {str(e)}")
         return None
 
-def convert_txt_to_docx(content):
-    """txt 내용을 docx로 변환"""
-    try:
-        # docx 파일 생성
-        doc = Document()
-        
-        # 텍스트 디코딩 시도
-        if isinstance(content, bytes):
-            # 여러 인코딩 시도
-            for encoding in ['utf-8', 'cp949', 'euc-kr']:
-                try:
-                    text = content.decode(encoding)
-                    break
-                except UnicodeDecodeError:
-                    continue
-        else:
-            text = content
-            
-        if not text:
-            st.error("파일을 읽을 수 없습니다.")
-            return None
-            
-        # 문단 추가 및 글꼴 설정
-        paragraph = doc.add_paragraph(text)
-        for run in paragraph.runs:
-            run.font.name = "맑은 고딕"
-            run.font.ascii_font = "맑은 고딕"
-            run.font.eastasia_font = "맑은 고딕"
-        
-        # ���시 파일로 저장
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp:
-            doc.save(tmp.name)
-            return tmp.name
-            
-    except Exception as e:
-        st.error(f"변환 중 오류 발생: {str(e)}")
-        return None
-
 def highlight_keywords(content, keyword_notes):
     """키워드 강조"""
     try:
-        # 파일 확장자 확인
+        # 파일 확장자 확인 (임시 파일 없이 메모리에서 바로 문서 열기)
         if content.type == "text/plain":
-            # txt 파일을 docx로 변환
-            file_content = content.getvalue()
-            doc_path = convert_txt_to_docx(file_content)
-            if not doc_path:
-                return None
-        else:
-            # docx 파일 임시 저장
-            with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp:
-                tmp.write(content.getvalue())
-                doc_path = tmp.name
-
-        # docx 파일 처리
-        doc = Document(doc_path)
+            # txt는 줄마다 단락으로 변환하면서 바로 강조 (변환한 문서를 다시 열지 않음)
+            result, _ = review_document(content.getvalue(), True, keyword_notes)
+            return io.BytesIO(result)
         
-        # 모든 단락을 순회
-        for paragraph in doc.paragraphs:
-            # 단락의 텍스트 저장
-            text = paragraph.text
-            
-            # 키워드 위치 찾기
-            positions = []
-            for keyword in keyword_notes.keys():
-                start = 0
-                while True:
-                    index = text.find(keyword, start)
-                    if index == -1:
-                        break
-                    positions.append((index, index + len(keyword), keyword))
-                    start = index + 1
-            
-            if positions:
-                # 위치를 정렬
-                positions.sort()
-                
-                # 기존 runs 제거
-                for run in paragraph.runs:
-                    run._element.getparent().remove(run._element)
-                
-                # 새로운 runs 추가
-                current_pos = 0
-                for start, end, keyword in positions:
-                    # 키워드 전 텍스트
-                    if start > current_pos:
-                        run = paragraph.add_run(text[current_pos:start])
-                        run.font.name = "맑은 고딕"
-                    
-                    # 키워드 (빨간색으로, 굵게)
-                    run = paragraph.add_run(keyword)
-                    run.font.name = "맑은 고딕"
-                    run.font.color.rgb = RGBColor(251, 65, 65)
-                    run.bold = True
-                    
-                    # 노트 추가
-                    if keyword_notes[keyword]:
-                        note_run = paragraph.add_run(f" {keyword_notes[keyword]}")
-                        note_run.font.name = "맑은 고딕"
-                        note_run.font.color.rgb = RGBColor(92, 179, 56)
-                    
-                    current_pos = end
-                
-                # 마지막 키워드 이후 텍스트
-                if current_pos < len(text):
-                    run = paragraph.add_run(text[current_pos:])
-                    run.font.name = "맑은 고딕"
+        # 업로드 파일(BytesIO)에서 바로 docx 열기
+        content.seek(0)
+        doc = Document(content)
         
-        # 결과 파일 저장
-        result_path = os.path.join(tempfile.gettempdir(), "검수결과.docx")
-        doc.save(result_path)
+        # 키워드가 걸린 run만 나눠서 강조 (나머지 run과 서식은 그대로 유지)
+        highlight_document(doc, keyword_notes)
         
-        # 임시 파일 삭제
-        try:
-            os.remove(doc_path)
-        except:
-            pass
-            
-        return result_path
+        # 결과는 파일로 저장하지 않고 메모리 버퍼로 반환
+        output = io.BytesIO()
+        doc.save(output)
+        output.seek(0)
+        return output
         
     except Exception as e:
         st.error(f"오류 발생: {str(e)}")
@@ -180,23 +85,16 @@ def main():
     if uploaded_file:
         if st.button("검수 시작"):
             with st.spinner("검수 중..."):
-                result_path = highlight_keywords(uploaded_file, keyword_notes)
+                result = highlight_keywords(uploaded_file, keyword_notes)
                 
-                if result_path:
+                if result:
                     # 결과 파일 다운로드 버튼
-                    with open(result_path, 'rb') as f:
-                        st.download_button(
-                            label="검수 결과 다운로드",
-                            data=f,
-                            file_name=f"검수결과_{uploaded_file.name}",
-                            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                        )
-                    
-                    # 임시 파일 삭제
-                    try:
-                        os.remove(result_path)
-                    except:
-                        pass
+                    st.download_button(
+                        label="검수 결과 다운로드",
+                        data=result,
+                        file_name=f"검수결과_{uploaded_file.name}",
+                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                    )
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file